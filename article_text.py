@@ -0,0 +1,103 @@
+import codecs
+import re
+import time
+from html.parser import HTMLParser
+
+
+# Elements whose text is never part of the article body
+SKIP_TAGS = {'script', 'style', 'nav', 'header', 'footer', 'noscript', 'template', 'svg'}
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class ArticleTextExtractor(HTMLParser):
+    """Incremental HTML-to-text parser that stops collecting once max_chars is reached."""
+
+    def __init__(self, max_chars=3000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self._skip_depth = 0
+        # Text runs can arrive split across feed() calls; join them until the next tag
+        self._pending = []
+
+    def _flush(self):
+        text = ''.join(self._pending).strip()
+        self._pending = []
+        if text and not self.done:
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self.done:
+            self._pending.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    @property
+    def done(self):
+        return self.length >= self.max_chars
+
+    def text(self):
+        return '\n'.join(self.parts)[:self.max_chars]
+
+
+def sniff_encoding(head, default='utf-8'):
+    """Guess a document's encoding from a <meta charset> in its first bytes."""
+    match = META_CHARSET.search(head[:4096])
+    if match:
+        name = match.group(1).decode('ascii', 'ignore')
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return default
+
+
+def extract_text_streaming(chunks, encoding=None, max_chars=3000, max_bytes=2 * 1024 * 1024, max_seconds=15):
+    """Extract article text from an iterable of byte chunks without buffering the whole body.
+
+    Reading stops as soon as max_chars of text are collected, max_bytes have been
+    read or max_seconds have elapsed. Returns (text, raw bytes read, complete), where
+    complete is True only if the whole body was consumed.
+    """
+    started = time.monotonic()
+    extractor = ArticleTextExtractor(max_chars)
+    decoder = None
+    raw = bytearray()
+    complete = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:max(0, max_bytes - len(raw))]
+        raw.extend(chunk)
+        if decoder is None:
+            # Wait for enough of the head to find a <meta charset> before decoding
+            if not encoding and len(raw) < 1024:
+                continue
+            decoder = codecs.getincrementaldecoder(encoding or sniff_encoding(bytes(raw)))(errors='replace')
+            chunk = bytes(raw)
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done or len(raw) >= max_bytes or time.monotonic() - started > max_seconds:
+            complete = False
+            break
+    else:
+        if decoder is None and raw:
+            decoder = codecs.getincrementaldecoder(encoding or sniff_encoding(bytes(raw)))(errors='replace')
+            extractor.feed(decoder.decode(bytes(raw)))
+        if decoder is not None:
+            extractor.feed(decoder.decode(b'', final=True))
+    extractor.close()
+    return extractor.text(), bytes(raw), complete
@@ -0,0 +1,64 @@
+"""Backends that CompetitorMonitor creates on first use.
+
+Client libraries (gspread/google-auth, smtplib) are imported inside these
+helpers, so helpers and partial run modes that never touch a backend do not
+pay for its imports or its auth round-trips.
+"""
+import json
+import os
+
+
+def load_service_account(path):
+    """Service account info from GOOGLE_SERVICE_ACCOUNT_JSON (GitHub Actions), else from path."""
+    sa_json = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON", "").strip()
+    if sa_json:
+        print(f"Loading service account from environment variable (length: {len(sa_json)} chars)...")
+        try:
+            service_account_info = json.loads(sa_json)
+        except json.JSONDecodeError as e:
+            print(f"ERROR: GOOGLE_SERVICE_ACCOUNT_JSON is not valid JSON: {e}")
+            print(f"First 50 chars: {repr(sa_json[:50])}")
+            raise
+    else:
+        print(f"Loading service account from {path}...")
+        with open(path, 'r', encoding='utf-8') as f:
+            service_account_info = json.load(f)
+
+    # Ensure private key has correct newlines
+    if 'private_key' in service_account_info:
+        service_account_info['private_key'] = service_account_info['private_key'].replace('\\n', '\n')
+    return service_account_info
+
+
+def open_spreadsheet(spreadsheet_id, sheets_io, service_account_file):
+    """Authorize the service account and open the spreadsheet through sheets_io."""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    scope = [
+        'https://www.googleapis.com/auth/spreadsheets',
+        'https://www.googleapis.com/auth/drive'
+    ]
+    creds = Credentials.from_service_account_info(load_service_account(service_account_file), scopes=scope)
+    client = gspread.authorize(creds)
+    return sheets_io.call(client.open_by_key, spreadsheet_id)
+
+
+class SmtpMailer:
+    """Send MIME messages through an SMTP relay with login (and STARTTLS unless disabled)."""
+
+    def __init__(self, host, port, user, password, starttls=True):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+
+    def send(self, msg, to_addrs):
+        import smtplib
+
+        with smtplib.SMTP(self.host, self.port) as server:
+            if self.starttls:
+                server.starttls()
+            server.login(self.user, self.password)
+            server.sendmail(self.user, to_addrs, msg.as_string())
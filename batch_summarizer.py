@@ -0,0 +1,66 @@
+import json
+
+
+SYSTEM_PROMPT = "あなたは記事要約の専門家です。簡潔に要約してください。"
+
+
+def estimate_tokens(text):
+    """Rough token estimate: ~4 ASCII characters per token, ~1 token per other character."""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def pack_batches(items, token_budget, max_items):
+    """Greedily group (id, title, text) items into batches under token_budget.
+
+    Items keep their order; an item larger than the budget gets a batch of its own.
+    """
+    batches = []
+    current = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item[1]) + estimate_tokens(item[2]) + 20
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            used = 0
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def single_prompt(title, text):
+    return f"""以下の記事内容を日本語で200文字以内に要約してください。
+記事タイトル: {title}
+記事内容:
+{text}
+
+要約のみを出力してください。"""
+
+
+def batch_prompt(batch):
+    articles = [{'id': str(item_id), 'title': title, 'text': text} for item_id, title, text in batch]
+    return f"""以下のJSON配列の各記事を、それぞれ日本語で200文字以内に要約してください。
+出力は [{{"id": "<記事のid>", "summary": "<要約>"}}] 形式のJSON配列のみとし、入力と同じidを使ってください。
+記事:
+{json.dumps(articles, ensure_ascii=False)}"""
+
+
+def parse_batch_response(content):
+    """Map id -> summary from a batch response; returns {} if no JSON array can be read."""
+    content = (content or '').replace("```json", "").replace("```", "")
+    start, end = content.find('['), content.rfind(']')
+    if start == -1 or end < start:
+        return {}
+    try:
+        items = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    summaries = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and item.get('id') is not None and item.get('summary'):
+            summaries[str(item['id'])] = str(item['summary']).strip()[:500]  # Safety limit
+    return summaries
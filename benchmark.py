@@ -0,0 +1,548 @@
+"""Offline benchmark: run CompetitorMonitor.run() end to end against local stand-ins.
+
+A local HTTP server serves synthetic news/IR/article pages and a mock
+OpenAI-compatible /v1/chat/completions endpoint, the spreadsheet is kept in
+memory and the digest email goes to a dummy SMTP server. Nothing leaves the
+machine, so runs can be compared against a saved baseline:
+
+    python benchmark.py --targets 50 --output baseline.json
+    python benchmark.py --targets 50 --baseline baseline.json
+    python benchmark.py --targets 50 --shards 4 --baseline baseline.json
+
+Tuning knobs of scraper.py (MONITOR_MAX_WORKERS, HOST_RATE_PER_SEC, ...) can be
+set in the environment as usual.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import shutil
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+
+import gspread
+
+
+NEWS_HIT = "花粉症のオンライン診療を開始しました"
+IR_HIT = "2025年3月期 決算短信"
+FILLER = "会社概要"
+ARTICLE_PARAGRAPH = "当社はオンライン診療サービスの提供エリアを拡大し、花粉症の患者さまがご自宅から受診できる体制を整えました。"
+OFFTOPIC_PARAGRAPH = "本社オフィスの移転に伴い、代表電話番号と郵送先住所を変更いたしました。"
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+# --- Synthetic web + mock Grok ---------------------------------------------
+
+class SyntheticWeb:
+    """Deterministic page generator shared by every site server."""
+
+    def __init__(self, links, match_ratio, page_kb, article_kb, latency, llm_latency, x_items, feed_ratio=0.0,
+                 relevant_ratio=1.0):
+        self.links = links
+        self.feed_ratio = feed_ratio
+        self.relevant_ratio = relevant_ratio
+        self.match_ratio = match_ratio
+        self.page_kb = page_kb
+        self.article_kb = article_kb
+        self.latency = latency
+        self.llm_latency = llm_latency
+        self.x_items = x_items
+        self.base_url = None
+        self.requests = 0
+        self.bytes_sent = 0
+        self.llm_requests = 0
+        self._lock = threading.Lock()
+
+    def count(self, size, llm=False):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+            if llm:
+                self.llm_requests += 1
+
+    def has_feed(self, target):
+        return int(target) % 100 < self.feed_ratio * 100
+
+    def link_texts(self, target, kind):
+        hit = NEWS_HIT if kind == 'news' else IR_HIT
+        matches = round(self.links * self.match_ratio)
+        return [(f"/t/{target}/article/{kind}-{j}", f"{hit} ({target}-{j})" if j < matches else f"{FILLER} {j}")
+                for j in range(self.links)]
+
+    def listing(self, target, kind):
+        anchors = ''.join(f'<li><a href="{href}">{text}</a></li>' for href, text in self.link_texts(target, kind))
+        head = (f'<link rel="alternate" type="application/rss+xml" href="/t/{target}/{kind}/feed">'
+                if self.has_feed(target) else '')
+        return self.page(f"{kind} {target}", '<ul>' + anchors + '</ul>', self.page_kb, head)
+
+    def feed(self, target, kind):
+        items = ''.join(
+            f"<item><title>{text}</title><link>{self.base_url}{href}</link>"
+            f"<pubDate>Mon, 12 Oct 2026 {j % 24:02d}:00:00 +0000</pubDate></item>"
+            for j, (href, text) in enumerate(self.link_texts(target, kind))
+        )
+        return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{kind} {target}</title>{items}</channel></rss>' \
+            .encode('utf-8')
+
+    def on_topic(self, name):
+        """Articles behind keyword links, and relevant_ratio of the others, mention the keywords."""
+        index = name.rsplit('-', 1)[-1]
+        if '-article-' not in name or not index.isdigit():
+            return True
+        matches = round(self.links * self.match_ratio)
+        return int(index) < matches or int(index) - matches < self.relevant_ratio * (self.links - matches)
+
+    def article(self, name):
+        text = ARTICLE_PARAGRAPH if self.on_topic(name) else OFFTOPIC_PARAGRAPH
+        return self.page(unquote(name), f"<h1>{unquote(name)}</h1>", self.article_kb, text=text)
+
+    @staticmethod
+    def page(title, body, size_kb, head_extra='', text=ARTICLE_PARAGRAPH):
+        head = f"<html><head><meta charset='utf-8'><title>{title}</title>{head_extra}" \
+               "<script>var tracking = true;</script></head><body><nav>menu</nav>"
+        html = head + body
+        paragraph = f"<p>{text}</p>"
+        while len(html.encode('utf-8')) < size_kb * 1024:
+            html += paragraph
+        return (html + "<footer>footer</footer></body></html>").encode('utf-8')
+
+    def completion(self, body):
+        """Mock answer for a chat completion request: X search results or article summaries."""
+        prompt = body['messages'][-1]['content']
+        if 'JSON list' in prompt:
+            company = prompt.split("'")[1] if "'" in prompt else 'target'
+            items = [{
+                'title': f"{company} post {k}",
+                'url': f"{self.base_url}/x/{quote(company)}/{k}",
+                'summary': f"{company} announced {NEWS_HIT} ({k})",
+            } for k in range(self.x_items)]
+            return json.dumps(items, ensure_ascii=False)
+        if '記事:\n' in prompt:
+            articles = json.loads(prompt.rsplit('記事:\n', 1)[1])
+            return json.dumps([{'id': a['id'], 'summary': f"{a['title'][:40]}の要約"} for a in articles],
+                              ensure_ascii=False)
+        return "記事の要約です。"
+
+
+class WebHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    web = None
+
+    def log_message(self, *args):
+        pass
+
+    def body_for(self, path):
+        parts = path.strip('/').split('/')
+        if len(parts) == 3 and parts[0] == 't' and parts[2] in ('news', 'ir'):
+            return self.web.listing(parts[1], parts[2])
+        if len(parts) == 4 and parts[0] == 't' and parts[3] == 'feed' and self.web.has_feed(parts[1]):
+            return self.web.feed(parts[1], parts[2])
+        if len(parts) >= 3 and parts[0] in ('t', 'x'):
+            return self.web.article('-'.join(parts[1:]))
+        return None
+
+    def send_body(self, body, head=False):
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            self.web.count(0)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+        self.web.count(0 if head else len(body))
+
+    def do_GET(self, head=False):
+        time.sleep(self.web.latency)
+        body = self.body_for(urlparse(self.path).path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_body(body, head=head)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        time.sleep(self.web.llm_latency)
+        content = self.web.completion(body)
+        usage = {'prompt_tokens': len(json.dumps(body)) // 4, 'completion_tokens': len(content) // 2}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        base = {'id': 'chatcmpl-bench', 'created': int(time.time()), 'model': body.get('model')}
+        if body.get('stream'):
+            self.stream_completion(base, content, usage)
+            return
+        payload = json.dumps(dict(base, object='chat.completion', usage=usage, choices=[{
+            'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content},
+        }]), ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.web.count(len(payload), llm=True)
+
+    def stream_completion(self, base, content, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        pieces = [content[i:i + 40] for i in range(0, len(content), 40)] or ['']
+        for i, piece in enumerate(pieces):
+            last = i == len(pieces) - 1
+            chunk = dict(base, object='chat.completion.chunk', choices=[{
+                'index': 0, 'delta': {'content': piece}, 'finish_reason': 'stop' if last else None,
+            }])
+            if last:
+                chunk['usage'] = usage
+            event = f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+            self.wfile.write(event)
+            sent += len(event)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.web.count(sent, llm=True)
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Streaming article reads stop at their character limit and drop the connection
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_servers(web, count):
+    """Start count site servers (distinct host:port pairs, like distinct target hosts)."""
+    servers = []
+    for _ in range(count):
+        handler = type('BoundWebHandler', (WebHandler,), {'web': web})
+        server = QuietHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    web.base_url = f"http://127.0.0.1:{servers[0].server_address[1]}"
+    return servers
+
+
+# --- In-memory spreadsheet --------------------------------------------------
+
+class MemoryWorksheet:
+    """The subset of gspread.Worksheet used by scraper.py, kept in memory."""
+
+    def __init__(self, spreadsheet, title, rows=1000, cols=26, latency=0.0):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows = []
+        self.grid_rows = rows
+        self.latency = latency
+
+    def _call(self, write=False):
+        time.sleep(self.latency)
+        if write:
+            self.spreadsheet.touch()
+
+    @property
+    def row_count(self):
+        return max(self.grid_rows, len(self.rows))
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values])
+
+    def append_rows(self, values, **kwargs):
+        self._call(write=True)
+        self.rows.extend(list(map(str, row)) for row in values)
+
+    def get_all_values(self):
+        self._call()
+        return [list(row) for row in self.rows]
+
+    def get_all_records(self):
+        self._call()
+        if not self.rows:
+            return []
+        header = self.rows[0]
+        return [dict(zip(header, row + [''] * (len(header) - len(row)))) for row in self.rows[1:]]
+
+    def row_values(self, row):
+        self._call()
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._call()
+        return [row[col - 1] for row in self.rows if len(row) >= col]
+
+
+class MemorySpreadsheet:
+    """The subset of gspread.Spreadsheet used by scraper.py, kept in memory."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.worksheets = {}
+        self.revision = 0
+
+    def touch(self):
+        self.revision += 1
+
+    @property
+    def lastUpdateTime(self):
+        return str(self.revision)
+
+    def worksheet(self, title):
+        time.sleep(self.latency)
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, rows=1000, cols=26):
+        time.sleep(self.latency)
+        self.worksheets[title] = MemoryWorksheet(self, title, rows, cols, self.latency)
+        self.touch()
+        return self.worksheets[title]
+
+
+# --- Dummy SMTP ---------------------------------------------------------------
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA) to accept a message."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b"\r\n")
+
+    def handle(self):
+        self.reply("220 benchmark ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply("250-benchmark")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == 'AUTH':
+                if command.upper().startswith('AUTH LOGIN'):
+                    for prompt in (b"Username:", b"Password:"):
+                        self.reply("334 " + base64.b64encode(prompt).decode('ascii'))
+                        self.rfile.readline()
+                self.reply("235 Authentication successful")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data in iter(self.rfile.readline, b''):
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    size += len(data)
+                self.server.messages.append(size)
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def start_smtp():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SmtpHandler)
+    server.daemon_threads = True
+    server.messages = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- Runner -------------------------------------------------------------------
+
+def seed_spreadsheet(servers, targets, latency):
+    spreadsheet = MemorySpreadsheet(latency)
+    config = spreadsheet.add_worksheet("Config", rows=targets + 1, cols=4)
+    rows = [["Company Name", "News URL", "X Query (Optional)", "IR URL (Optional)"]]
+    for i in range(targets):
+        base = f"http://127.0.0.1:{servers[i % len(servers)].server_address[1]}/t/{i:04d}"
+        rows.append([f"Bench Company {i:04d}", f"{base}/news", "", f"{base}/ir"])
+    config.append_rows(rows)
+    return spreadsheet
+
+
+def timed(monitor, action):
+    started = time.perf_counter()
+    try:
+        action(monitor)
+    finally:
+        monitor.close()
+    return time.perf_counter() - started
+
+
+def run_once(scraper, spreadsheet, web, smtp, measure_memory, mode=None, cache_dirs=None):
+    """One run; with several cache_dirs, a sharded run (one runner per cache) plus the merge step."""
+    requests_before, bytes_before, llm_before = web.requests, web.bytes_sent, web.llm_requests
+    mails_before = len(smtp.messages)
+    if measure_memory:
+        tracemalloc.reset_peak()
+
+    shards = len(cache_dirs) - 1 if cache_dirs and len(cache_dirs) > 1 else 1
+    if shards == 1:
+        monitor = scraper.CompetitorMonitor(spreadsheet=spreadsheet, mode=mode)
+        monitors = [monitor]
+        elapsed = timed(monitor, lambda m: m.run())
+        saved = monitor
+    else:
+        scraper.SHARD_DIR = tempfile.mkdtemp(prefix='shards-', dir=os.path.dirname(cache_dirs[0]))
+        monitors = []
+        durations = []
+        for k in range(shards):
+            scraper.CACHE_DIR = cache_dirs[k]
+            monitors.append(scraper.CompetitorMonitor(spreadsheet=spreadsheet, mode=mode, shard=(k, shards)))
+            durations.append(timed(monitors[-1], lambda m: m.run()))
+        scraper.CACHE_DIR = cache_dirs[-1]
+        saved = scraper.CompetitorMonitor(spreadsheet=spreadsheet, mode=mode)
+        # Shard runners work in parallel on a job matrix; the merge job runs after the slowest
+        elapsed = max(durations) + timed(saved, lambda m: m.merge_shards(scraper.SHARD_DIR))
+        monitors.append(saved)
+
+    # Each (target, fetcher) stage is one task: its wall time is the task latency
+    latencies = [counters['seconds'] for monitor in monitors for stages in monitor.profiler.targets.values()
+                 for name, counters in stages.items() if name in ('x', 'news', 'ir')]
+    llm = [s for monitor in monitors if monitor.created('llm') for s in monitor.llm.stats_dict().values()]
+    targets = sum(len(monitor.profiler.targets) for monitor in monitors)
+    data = spreadsheet.worksheets.get("Data")
+    return {
+        'seconds': round(elapsed, 3),
+        'targets': targets,
+        'tasks': len(latencies),
+        'rows_written': len(saved.new_results),
+        'data_rows': len(data.rows) - 1 if data else 0,
+        'targets_per_second': round(targets / elapsed, 2) if elapsed else 0.0,
+        'task_p50_seconds': round(percentile(latencies, 0.5), 4),
+        'task_p95_seconds': round(percentile(latencies, 0.95), 4),
+        # Worst model (grok-3 for X, grok-4 for summaries)
+        'llm_p50_seconds': round(max((s['latency_p50'] for s in llm), default=0.0), 4),
+        'llm_p95_seconds': round(max((s['latency_p95'] for s in llm), default=0.0), 4),
+        'http_requests': web.requests - requests_before,
+        'llm_requests': web.llm_requests - llm_before,
+        'bytes_served': web.bytes_sent - bytes_before,
+        'emails': len(smtp.messages) - mails_before,
+        'sheets_calls': sum(m.sheets_io.calls for m in monitors if m.created('sheets_io')),
+        'peak_memory_mb': round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2) if measure_memory else None,
+    }
+
+
+def summarize(runs):
+    keys = [k for k, v in runs[0].items() if isinstance(v, (int, float))]
+    return {k: round(statistics.median(run[k] for run in runs), 4) for k in keys}
+
+
+def compare(summary, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['summary']
+    print(f"\nAgainst baseline {baseline_path}:")
+    for key, value in summary.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        print(f"  {key:22} {before:>12} -> {value:>12} ({(value - before) / before:+.1%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--targets', type=int, default=20, help='synthetic Config targets')
+    parser.add_argument('--hosts', type=int, default=8, help='site servers the targets are spread over')
+    parser.add_argument('--links', type=int, default=40, help='anchors per news/IR page')
+    parser.add_argument('--match-ratio', type=float, default=0.1, help='share of anchors matching keywords')
+    parser.add_argument('--page-kb', type=int, default=64, help='news/IR page size')
+    parser.add_argument('--article-kb', type=int, default=32, help='article page size')
+    parser.add_argument('--feed-ratio', type=float, default=0.0,
+                        help='share of targets whose pages advertise an RSS feed')
+    parser.add_argument('--relevant-ratio', type=float, default=0.2,
+                        help='share of articles behind non-matching links that are on topic')
+    parser.add_argument('--x-items', type=int, default=2, help='items in each mock X response')
+    parser.add_argument('--latency-ms', type=float, default=20, help='site response latency')
+    parser.add_argument('--llm-latency-ms', type=float, default=200, help='mock Grok response latency')
+    parser.add_argument('--sheets-latency-ms', type=float, default=50, help='in-memory Sheets call latency')
+    parser.add_argument('--mode', help='scraper run mode (default: RUN_MODE, i.e. full)')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='split the run into N shard runs plus a merge (seconds = slowest shard + merge)')
+    parser.add_argument('--runs', type=int, default=1, help='repetitions (the median is reported)')
+    parser.add_argument('--warm', action='store_true',
+                        help='keep caches and the spreadsheet between runs (incremental runs)')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc (it slows the run down)')
+    parser.add_argument('--output', help='write the results as JSON (usable as a --baseline)')
+    parser.add_argument('--baseline', help='compare against a previous --output file')
+    args = parser.parse_args(argv)
+
+    web = SyntheticWeb(args.links, args.match_ratio, args.page_kb, args.article_kb,
+                       args.latency_ms / 1000, args.llm_latency_ms / 1000, args.x_items, args.feed_ratio,
+                       args.relevant_ratio)
+    servers = start_servers(web, max(1, args.hosts))
+    smtp = start_smtp()
+    workdir = tempfile.mkdtemp(prefix='monitor-bench-')
+
+    # scraper.py reads its settings at import time
+    os.environ.update({
+        'GROK_API_KEY': 'benchmark', 'SPREADSHEET_ID': 'benchmark',
+        'GROK_BASE_URL': f"{web.base_url}/v1",
+        'SMTP_HOST': '127.0.0.1', 'SMTP_PORT': str(smtp.server_address[1]), 'SMTP_STARTTLS': '0',
+        'GMAIL_USER': 'bench@example.com', 'GMAIL_APP_PASSWORD': 'benchmark', 'TO_EMAIL': 'bench@example.com',
+        'REPORT_DIR': os.path.join(workdir, 'reports'), 'PROFILE_MODE': '',
+    })
+    os.environ.setdefault('SCHEDULING', '0')
+    import scraper
+
+    if not args.no_memory:
+        tracemalloc.start()
+    runs = []
+    spreadsheet = None
+    for i in range(args.runs):
+        if spreadsheet is None or not args.warm:
+            # One cache per runner: each shard, and the merge step
+            cache_dirs = [tempfile.mkdtemp(prefix='cache-', dir=workdir)
+                          for _ in range(args.shards + 1 if args.shards > 1 else 1)]
+            scraper.CACHE_DIR = cache_dirs[0]
+            spreadsheet = seed_spreadsheet(servers, args.targets, args.sheets_latency_ms / 1000)
+        result = run_once(scraper, spreadsheet, web, smtp, not args.no_memory, args.mode, cache_dirs)
+        runs.append(result)
+        print(f"\n[benchmark] run {i + 1}/{args.runs}: {json.dumps(result)}", file=sys.stderr)
+
+    summary = summarize(runs)
+    print("\nBenchmark summary (median of runs):")
+    for key, value in summary.items():
+        print(f"  {key:22} {value}")
+    if args.baseline:
+        compare(summary, args.baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'runs': runs, 'summary': summary}, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+
+    for server in servers + [smtp]:
+        server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
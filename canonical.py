@@ -0,0 +1,181 @@
+import hashlib
+import random
+import re
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+# Query parameters that only carry tracking information
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'yclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'ref_src', 'ref_url', 'cmpid', 'spm',
+}
+TRACKING_PREFIXES = ('utm_', 'hsa_', 'pk_')
+HOST_ALIASES = {
+    'twitter.com': 'x.com',
+    'mobile.twitter.com': 'x.com',
+    'mobile.x.com': 'x.com',
+}
+
+
+def canonicalize_url(url):
+    """Normalize a URL so trivially different variants compare equal.
+
+    Drops fragments, tracking parameters, default ports, 'www.' and trailing
+    slashes, folds http/https together and sorts the remaining query.
+    Non-HTTP values are returned stripped but otherwise unchanged.
+    """
+    url = str(url or '').strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if parts.scheme.lower() not in ('http', 'https') or not parts.netloc:
+        return url
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    host = HOST_ALIASES.get(host, host)
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path or '')
+    if path.endswith('/'):
+        path = path.rstrip('/')
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def normalize_text(text):
+    """Fold width/case and collapse whitespace and punctuation for comparison."""
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    return re.sub(r'[\s\W_]+', ' ', text).strip()
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index over character shingles of item titles and summaries."""
+
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.8, shingle_size=3, min_shingles=8):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        rng = random.Random(42)
+        self._perms = [(rng.randrange(1, self.PRIME), rng.randrange(0, self.PRIME)) for _ in range(num_perm)]
+        self._buckets = {}
+        self._signatures = []
+
+    def shingles(self, text):
+        text = normalize_text(text).replace(' ', '')
+        k = self.shingle_size
+        return {text[i:i + k] for i in range(max(0, len(text) - k + 1))}
+
+    def signature(self, text):
+        """Return the MinHash signature of text, or None if it is too short to compare."""
+        shingles = self.shingles(text)
+        if len(shingles) < self.min_shingles:
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+                  for s in shingles]
+        return tuple(min((a * h + b) % self.PRIME for h in hashes) for a, b in self._perms)
+
+    def similarity(self, sig_a, sig_b):
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / self.num_perm
+
+    def _band_keys(self, sig, group):
+        return [(group, i, sig[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def query(self, sig, group='', accept=None):
+        """Return the id of an indexed near-duplicate of sig within group, or None.
+
+        accept(item_id), if given, can veto a candidate that is similar enough.
+        """
+        candidates = set()
+        for key in self._band_keys(sig, group):
+            candidates.update(self._buckets.get(key, ()))
+        for item_id in sorted(candidates):
+            if self.similarity(sig, self._signatures[item_id]) >= self.threshold:
+                if accept is None or accept(item_id):
+                    return item_id
+        return None
+
+    def add(self, sig, group=''):
+        """Index sig under group and return its id."""
+        item_id = len(self._signatures)
+        self._signatures.append(sig)
+        for key in self._band_keys(sig, group):
+            self._buckets.setdefault(key, []).append(item_id)
+        return item_id
+
+
+def digit_runs(text):
+    """Numbers in text (e.g. fiscal year and quarter), which near-duplicates must share."""
+    return re.findall(r'\d+', normalize_text(text))
+
+
+def item_text(res):
+    """Text used to compare results: the title, plus the summary when it adds anything."""
+    title = str(res.get('title') or '')
+    summary = str(res.get('summary') or '')
+    if summary and title not in summary:
+        return f"{title} {summary}"
+    return title
+
+
+def merge_near_duplicates(results):
+    """Drop results whose canonical URL or content repeats an earlier one (per company).
+
+    The first occurrence wins, so the output order stays deterministic. Each kept
+    result gets a 'canonical_url' key and a 'merged_sources' list of the sources
+    whose duplicates were folded into it. Similar text alone only merges items
+    from different sources whose numbers match, so "第1四半期" and "第2四半期"
+    documents on one page both stay.
+    """
+    index = NearDuplicateIndex()
+    by_url = {}
+    by_sig = {}
+    kept = []
+    for res in results:
+        canonical = canonicalize_url(res.get('url'))
+        company = str(res.get('company') or '')
+        # The X search fallback URL is shared by every unmatched post, so it is not an identity
+        url_key = (company, canonical) if canonical and '/search?' not in canonical else None
+
+        original = by_url.get(url_key) if url_key else None
+        sig = None
+        if original is None:
+            text = item_text(res)
+            sig = index.signature(text)
+            if sig is not None:
+                numbers = digit_runs(text)
+
+                def accept(item_id):
+                    other = by_sig[item_id]
+                    return other.get('source') != res.get('source') and digit_runs(item_text(other)) == numbers
+
+                dup_id = index.query(sig, company, accept)
+                if dup_id is not None:
+                    original = by_sig[dup_id]
+
+        if original is not None:
+            if res.get('source') not in original['merged_sources']:
+                original['merged_sources'].append(res.get('source'))
+            continue
+
+        res = dict(res, canonical_url=canonical, merged_sources=[res.get('source')])
+        kept.append(res)
+        if url_key:
+            by_url[url_key] = res
+        if sig is not None:
+            by_sig[index.add(sig, company)] = res
+    return kept
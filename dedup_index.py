@@ -0,0 +1,77 @@
+import hashlib
+import sqlite3
+import threading
+
+
+class DedupIndex:
+    """Local set of hashed URLs already written to the Data sheet."""
+
+    # Bump when the way keys are derived changes, to force a re-seed from the sheet
+    FORMAT_VERSION = '2'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS urls (hash BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+    @staticmethod
+    def url_hash(url):
+        # 16 bytes of SHA-1 keeps the table compact while collisions stay negligible
+        return hashlib.sha1(url.encode('utf-8')).digest()[:16]
+
+    def get_state(self):
+        """Return the (format, sheet key, revision, row count) the index was last synced at."""
+        with self._lock:
+            rows = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        return rows.get('version'), rows.get('sheet'), rows.get('revision'), rows.get('row_count')
+
+    def set_state(self, sheet_key, revision, row_count):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [('version', self.FORMAT_VERSION), ('sheet', sheet_key),
+                 ('revision', revision), ('row_count', str(row_count))]
+            )
+            self._db.commit()
+
+    def needs_sync(self, sheet_key, revision, row_count):
+        """True if the sheet differs from the state the index was built from."""
+        if revision is None:
+            return True
+        return self.get_state() != (self.FORMAT_VERSION, sheet_key, revision, str(row_count))
+
+    def rebuild(self, urls):
+        """Replace the index contents with the given URLs."""
+        with self._lock:
+            self._db.execute("DELETE FROM urls")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO urls VALUES (?)",
+                ((self.url_hash(u),) for u in urls if u)
+            )
+            self._db.commit()
+
+    def add(self, urls):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO urls VALUES (?)",
+                ((self.url_hash(u),) for u in urls if u)
+            )
+            self._db.commit()
+
+    def contains(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM urls WHERE hash = ?", (self.url_hash(url),)
+            ).fetchone()
+        return row is not None
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,366 @@
+import html
+import io
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from snapshot_store import short_hash
+
+
+FEED_TYPES = {'application/rss+xml': 'rss', 'application/atom+xml': 'atom', 'application/rdf+xml': 'rss'}
+# Root-level paths probed when a page does not advertise a feed
+WELL_KNOWN_PATHS = ('/feed', '/rss.xml', '/feed.xml', '/atom.xml', '/sitemap.xml')
+ROOT_KINDS = {'rss': 'rss', 'rdf': 'rss', 'feed': 'atom', 'urlset': 'sitemap', 'sitemapindex': 'sitemap'}
+ENTRY_TAGS = ('item', 'entry', 'url', 'sitemap')
+TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title>', re.I | re.S)
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class AlternateLinkParser(HTMLParser):
+    """Collect <link rel="alternate"> feed URLs from a document head, stopping at <body>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.feeds = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            raise _StopParsing()
+        if tag != 'link':
+            return
+        attrs = dict(attrs)
+        rel = (attrs.get('rel') or '').lower().split()
+        kind = FEED_TYPES.get((attrs.get('type') or '').lower().split(';')[0].strip())
+        if 'alternate' in rel and kind and attrs.get('href'):
+            self.feeds.append((attrs['href'], kind))
+
+
+def advertised_feeds(page_url, content):
+    """[(absolute feed URL, kind), ...] advertised in an HTML page's head."""
+    parser = AlternateLinkParser()
+    try:
+        parser.feed(content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content)
+        parser.close()
+    except _StopParsing:
+        pass
+    return [(urljoin(page_url, href), kind) for href, kind in parser.feeds]
+
+
+def section_prefix(page_url):
+    """Path prefix of the site section a page lists, e.g. '/ir/' for /ir/news.html."""
+    return urlsplit(page_url).path.rsplit('/', 1)[0] + '/'
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower() if isinstance(tag, str) else ''
+
+
+def sniff_kind(content):
+    """'rss', 'atom' or 'sitemap' from the XML root element, or None if content is not a feed."""
+    try:
+        for _, element in ET.iterparse(io.BytesIO(content), events=('start',)):
+            return ROOT_KINDS.get(local_name(element.tag))
+    except ET.ParseError:
+        return None
+    return None
+
+
+def parse_timestamp(value):
+    """Epoch seconds from an RFC 822 (RSS) or ISO 8601 (Atom, sitemap) date, or None."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def iter_entries(content):
+    """Yield (title, url, timestamp or None, is_sitemap_index) for each feed or sitemap entry.
+
+    Parses incrementally and drops each entry once read, so large sitemaps stay cheap.
+    """
+    fields = {}
+    for event, element in ET.iterparse(io.BytesIO(content), events=('start', 'end')):
+        name = local_name(element.tag)
+        if event == 'start':
+            if name in ENTRY_TAGS:
+                # Drop channel-level title/link read before the first entry
+                fields = {}
+            continue
+        if name in ('title', 'loc', 'pubdate', 'updated', 'published', 'lastmod', 'date'):
+            fields.setdefault(name, (element.text or '').strip())
+        elif name == 'link':
+            # RSS: <link>url</link>; Atom: <link rel="alternate" href="url"/>
+            href = element.get('href')
+            if href is None:
+                fields.setdefault('link', (element.text or '').strip())
+            elif element.get('rel', 'alternate') == 'alternate':
+                fields.setdefault('link', href)
+        elif name in ENTRY_TAGS:
+            url = fields.get('link') or fields.get('loc')
+            stamp = next((fields[k] for k in ('pubdate', 'published', 'updated', 'lastmod', 'date') if k in fields), None)
+            if url:
+                yield fields.get('title', ''), url, parse_timestamp(stamp), name == 'sitemap'
+            fields = {}
+            element.clear()
+
+
+class FeedReader:
+    """Feed-first link source for monitored pages.
+
+    Each page's RSS/Atom feed or sitemap is discovered once (advertised
+    <link rel="alternate">, then well-known paths) and cached; only entries in the
+    page's section of the site are read from it. Later runs only
+    fetch the feed (a conditional GET through fetch) and return entries
+    published since the newest entry seen last time. The read position moves on
+    only in commit(), after the entries' results are saved. Pages without a feed are
+    re-probed after discovery_ttl seconds; until then entries() returns None so
+    the caller falls back to scanning the page's anchors.
+    """
+
+    def __init__(self, path, fetch, discovery_ttl=7 * 86400, max_age=30 * 86400, sitemap_titles=20,
+                 max_child_sitemaps=5):
+        self.fetch = fetch
+        self.discovery_ttl = discovery_ttl
+        self.max_age = max_age
+        self.sitemap_titles = sitemap_titles
+        self.max_child_sitemaps = max_child_sitemaps
+        self.discovered = 0
+        self.feed_scans = 0
+        # Read positions of this run, stored by commit(): {page_url: (feed_url, kind, newest, seen URL hashes)}
+        self.pending = {}
+        self._lock = threading.Lock()
+        # Probe outcomes this run: pages on one host share the same well-known root paths
+        self._probed = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS feeds (
+                page_url TEXT PRIMARY KEY,
+                feed_url TEXT,
+                kind TEXT,
+                checked_at REAL,
+                last_seen REAL
+            )
+        """)
+        # URLs of entries without a date or dated at the read position, to tell new ones
+        # apart on the next read
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS undated (
+                page_url TEXT,
+                link BLOB,
+                PRIMARY KEY (page_url, link)
+            ) WITHOUT ROWID
+        """)
+        self._db.commit()
+
+    def _state(self, page_url):
+        with self._lock:
+            return self._db.execute(
+                "SELECT feed_url, kind, checked_at, last_seen FROM feeds WHERE page_url = ?", (page_url,)
+            ).fetchone()
+
+    def _save(self, page_url, feed_url, kind, last_seen=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?)",
+                (page_url, feed_url, kind, time.time(), last_seen)
+            )
+            self._db.commit()
+
+    def _probe(self, url):
+        """Return the kind of feed served at url, or None."""
+        with self._lock:
+            if url in self._probed:
+                return self._probed[url]
+        try:
+            kind = sniff_kind(self.fetch(url).content)
+        except Exception:
+            kind = None
+        with self._lock:
+            self._probed[url] = kind
+        return kind
+
+    def discover(self, page_url, sitemaps=True):
+        """Find and cache the feed for page_url; returns (feed URL, kind) or (None, None).
+
+        A feed (advertised or at a well-known path) is only taken if it lists
+        entries in the page's section: a site-wide blog feed or sitemap would
+        otherwise stand in for the page's own links. sitemaps=False skips sitemaps.
+        """
+        with self._lock:
+            self.discovered += 1
+        try:
+            advertised = advertised_feeds(page_url, self.fetch(page_url).content)
+        except Exception:
+            advertised = []
+        root = '{0.scheme}://{0.netloc}'.format(urlsplit(page_url))
+        candidates = advertised + [(root + path, None) for path in WELL_KNOWN_PATHS]
+        for feed_url, _ in candidates:
+            kind = self._probe(feed_url)
+            if not kind or (kind == 'sitemap' and not sitemaps):
+                continue
+            try:
+                listed = self._collect(page_url, feed_url, kind)
+            except Exception:
+                continue
+            if listed:
+                self._save(page_url, feed_url, kind)
+                return feed_url, kind
+        self._save(page_url, None, 'none')
+        return None, None
+
+    def _title(self, url):
+        try:
+            match = TITLE_RE.search(self.fetch(url).content[:65536])
+        except Exception:
+            return ''
+        return html.unescape(match.group(1).decode('utf-8', errors='replace')).strip() if match else ''
+
+    def _seen(self, page_url):
+        with self._lock:
+            return {row[0] for row in self._db.execute(
+                "SELECT link FROM undated WHERE page_url = ?", (page_url,)
+            )}
+
+    def _collect(self, page_url, feed_url, kind):
+        """All (title, URL, timestamp or None) entries of a feed in the monitored page's section.
+
+        Entries are narrowed to the page's section of the site (section_prefix), and
+        sitemap indexes are followed one level deep (up to max_child_sitemaps).
+        A 304 body is parsed too: the committed read position already filters it,
+        and a failed run's entries are still in it.
+        """
+        page = self.fetch(feed_url)
+        prefix = section_prefix(page_url)
+        if kind != 'sitemap':
+            return [(title, url, stamp) for title, url, stamp, _ in iter_entries(page.content)
+                    if urlsplit(url).path.startswith(prefix)]
+
+        entries = []
+        children = []
+        for title, url, stamp, is_index in iter_entries(page.content):
+            if is_index:
+                children.append(url)
+            elif urlsplit(url).path.startswith(prefix):
+                entries.append((title, url, stamp))
+        for child_url in children[:self.max_child_sitemaps]:
+            child = self.fetch(child_url)
+            entries += [(title, url, stamp) for title, url, stamp, is_index in iter_entries(child.content)
+                        if not is_index and urlsplit(url).path.startswith(prefix)]
+        return entries
+
+    def read(self, page_url, feed_url, kind, since):
+        """Entries of feed_url that are new since the last read.
+
+        Dated entries are new when published after since, or at since (day-only
+        dates often tie) if their URL was not read then; undated ones when their
+        URL was not in the feed last time. Returns (new entries, newest timestamp,
+        URL hashes of the undated entries and of those at the newest timestamp),
+        or None if the feed lists nothing in the page's section.
+        """
+        entries = self._collect(page_url, feed_url, kind)
+        if not entries:
+            return None
+        seen = self._seen(page_url)
+        newest = max([since] + [stamp for _, _, stamp in entries if stamp is not None])
+        remember = set()
+        fresh = []
+        for title, url, stamp in entries:
+            if stamp is not None and stamp < since:
+                continue
+            if stamp is None or stamp in (since, newest):
+                key = short_hash(url)
+                if stamp is None or stamp == newest:
+                    remember.add(key)
+                if key in seen and (stamp is None or stamp == since):
+                    continue
+            fresh.append([title, url, stamp])
+
+        if kind == 'sitemap':
+            # Sitemaps carry no titles: read them from the newest few new pages; the rest stay untitled
+            fresh.sort(key=lambda e: e[2] or 0, reverse=True)
+            for entry in fresh[:self.sitemap_titles]:
+                entry[0] = entry[0] or self._title(entry[1])
+        return [tuple(e) for e in fresh], newest, remember
+
+    def known(self, page_url):
+        """True if a read position of page_url's feed was committed (it was read before)."""
+        state = self._state(page_url)
+        return state is not None and state[0] is not None and state[3] is not None
+
+    def entries(self, page_url, sitemaps=True):
+        """New (title, URL, timestamp or None) entries for page_url, or None if it has no feed.
+
+        The read position moves past these entries on commit(). sitemaps=False
+        (e.g. IR pages, whose PDFs rarely appear in a sitemap) never reads a sitemap.
+        """
+        state = self._state(page_url)
+        if state is None or (state[1] == 'none' and time.time() - state[2] > self.discovery_ttl):
+            feed_url, kind = self.discover(page_url, sitemaps)
+            last_seen = None
+        else:
+            feed_url, kind, _, last_seen = state
+        if not feed_url or (kind == 'sitemap' and not sitemaps):
+            return None
+
+        since = last_seen if last_seen is not None else time.time() - self.max_age
+        try:
+            result = self.read(page_url, feed_url, kind, since)
+        except Exception as e:
+            # A feed that disappeared or broke is re-discovered next time
+            print(f"  Feed {feed_url} failed ({e}); scanning the page instead")
+            with self._lock:
+                self._db.execute("DELETE FROM feeds WHERE page_url = ?", (page_url,))
+                self._db.commit()
+            return None
+        if result is None:
+            # The feed no longer lists anything in this section: scan the page until re-discovery
+            self._save(page_url, None, 'none')
+            return None
+        fresh, newest, remember = result
+        with self._lock:
+            self.feed_scans += 1
+            self.pending[page_url] = (feed_url, kind, newest, sorted(key.hex() for key in remember))
+        return fresh
+
+    def commit(self):
+        """Store the read positions of this run's feeds, so their entries are not returned again."""
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        for page_url, (feed_url, kind, newest, seen) in pending.items():
+            self._save(page_url, feed_url, kind, last_seen=newest)
+            with self._lock:
+                self._db.execute("DELETE FROM undated WHERE page_url = ?", (page_url,))
+                self._db.executemany("INSERT INTO undated VALUES (?, ?)",
+                                     ((page_url, bytes.fromhex(key)) for key in seen))
+                self._db.commit()
+        return len(pending)
+
+    def report(self):
+        with self._lock:
+            known = self._db.execute("SELECT COUNT(*) FROM feeds WHERE feed_url IS NOT NULL").fetchone()[0]
+        return f"Feeds: {self.feed_scans} pages read via feeds, {self.discovered} discoveries, {known} feeds known"
+
+    def stats(self):
+        return {'feed_scans': self.feed_scans, 'discoveries': self.discovered}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
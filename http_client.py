@@ -0,0 +1,150 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostLimiter:
+    """Cap the number of concurrent requests sent to a single host."""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.limit)
+                self._semaphores[host] = semaphore
+        with semaphore:
+            yield
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0):
+        """Take amount tokens, sleeping if needed. Returns the time spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the tokens now (the balance may go negative) so waiters queue fairly
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HttpClient:
+    """Shared connection-pooled HTTP client with retries and per-host politeness limits."""
+
+    def __init__(self, headers=None, timeout=10, pool_connections=20, pool_maxsize=20,
+                 retries=3, backoff_factor=0.5, per_host_concurrency=2, per_host_rate=2.0,
+                 per_host_burst=4):
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self.host_limiter = HostLimiter(per_host_concurrency)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttle_wait = 0.0
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.per_host_rate, self.per_host_burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def request(self, method, url, **kwargs):
+        headers = dict(self.headers)
+        headers.update(kwargs.pop('headers', None) or {})
+        kwargs.setdefault('timeout', self.timeout)
+
+        host = urlparse(url).netloc.lower()
+        with self.host_limiter.slot(url):
+            waited = self._bucket(host).acquire() if self.per_host_rate > 0 else 0.0
+            response = self.session.request(method, url, headers=headers, **kwargs)
+
+        retry_state = getattr(response.raw, 'retries', None)
+        with self._lock:
+            self.requests += 1
+            self.throttle_wait += waited
+            if retry_state is not None:
+                self.retries += len(retry_state.history)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', True)
+        return self.request('HEAD', url, **kwargs)
+
+    def connection_stats(self):
+        """Return (requests sent on the wire, new connections opened) across all pools."""
+        sent = opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            sent += getattr(pool, 'num_requests', 0)
+            opened += getattr(pool, 'num_connections', 0)
+        return sent, opened
+
+    def stats(self):
+        sent, opened = self.connection_stats()
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'connections_opened': opened,
+            'connections_reused': max(0, sent - opened),
+            'throttle_wait_seconds': round(self.throttle_wait, 3),
+        }
+
+    def report(self):
+        sent, opened = self.connection_stats()
+        reused = max(0, sent - opened)
+        return (f"HTTP: {self.requests} requests, {self.retries} retries, {opened} connections opened, "
+                f"{reused} reused, {self.throttle_wait:.1f}s rate-limit wait")
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,159 @@
+import cProfile
+import csv
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class RunProfiler:
+    """Per-stage and per-target timings and counters for one run.
+
+    Stages nest per thread: counters added without an explicit stage or target go
+    to the innermost open stage, so downloads or tokens are attributed to the
+    target being processed. mode='cprofile' or 'tracemalloc' adds an opt-in
+    CPU profile or allocation snapshot to the report.
+    """
+
+    def __init__(self, mode=None):
+        self.mode = mode or None
+        self.started = time.time()
+        self.stages = {}
+        self.targets = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = []
+        self._main_profile = None
+        if self.mode == 'tracemalloc':
+            tracemalloc.start(25)
+        elif self.mode == 'cprofile':
+            self._main_profile = cProfile.Profile()
+            self._main_profile.enable()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, target, counters):
+        with self._lock:
+            buckets = [self.stages.setdefault(name, {})]
+            if target:
+                buckets.append(self.targets.setdefault(str(target), {}).setdefault(name, {}))
+            for bucket in buckets:
+                for key, value in counters.items():
+                    bucket[key] = bucket.get(key, 0) + value
+
+    @contextmanager
+    def stage(self, name, target=None):
+        """Time a block as `name`, attributed to target (or the enclosing stage's target)."""
+        stack = self._stack()
+        if target is None and stack:
+            target = stack[-1][1]
+        stack.append((name, target))
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            self._record(name, target, {'calls': 1, 'seconds': time.perf_counter() - started})
+
+    def add(self, stage=None, target=None, **counters):
+        """Add counters (bytes, tokens, hits, ...) to a stage, defaulting to the current one."""
+        stack = self._stack()
+        if stage is None:
+            stage = stack[-1][0] if stack else 'run'
+        if target is None and stack:
+            target = stack[-1][1]
+        self._record(stage, target, counters)
+
+    def wrap(self, fn):
+        """Profile fn in whatever thread it runs when cProfile mode is on."""
+        if self.mode != 'cprofile':
+            return fn
+
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._profiles.append(profile)
+        return profiled
+
+    def _cpu_profile(self, path):
+        self._main_profile.disable()
+        stats = pstats.Stats(self._main_profile)
+        for profile in self._profiles:
+            stats.add(profile)
+        stats.dump_stats(path)
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats('cumulative').print_stats(30)
+        return out.getvalue()
+
+    def _memory_profile(self):
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:30]
+        tracemalloc.stop()
+        return {
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top': [{'where': str(stat.traceback[0]), 'bytes': stat.size, 'count': stat.count} for stat in top],
+        }
+
+    def _claim_report(self, directory, name):
+        """Create <name>.json (then <name>-2.json, ...) exclusively; returns (base path, open file)."""
+        base = os.path.join(directory, name)
+        for n in range(2, 10000):
+            try:
+                return base, open(base + '.json', 'x', encoding='utf-8')
+            except FileExistsError:
+                base = os.path.join(directory, f"{name}-{n}")
+        raise FileExistsError(f"Too many reports named {name} in {directory}")
+
+    def write_report(self, directory, components=None, label=None):
+        """Write run-<timestamp>[-<label>].json and .csv (plus .prof in cProfile mode); returns the JSON path.
+
+        Runs finishing in the same second (e.g. shard runs and their merge) get a
+        -2, -3, ... suffix instead of overwriting each other.
+        """
+        os.makedirs(directory, exist_ok=True)
+        name = f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}" + (f"-{label}" if label else '')
+        base, f = self._claim_report(directory, name)
+        with self._lock:
+            report = {
+                'started_at': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'duration_seconds': round(time.time() - self.started, 3),
+                'stages': {k: dict(v) for k, v in self.stages.items()},
+                'targets': {t: {k: dict(v) for k, v in s.items()} for t, s in self.targets.items()},
+                'components': components or {},
+            }
+        with f:
+            if self.mode == 'cprofile':
+                report['cpu_profile'] = {'pstats_file': base + '.prof', 'top': self._cpu_profile(base + '.prof')}
+            elif self.mode == 'tracemalloc':
+                report['memory'] = self._memory_profile()
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+        rows = [('', name, counters) for name, counters in report['stages'].items()]
+        rows += [(target, name, counters) for target, stages in report['targets'].items()
+                 for name, counters in stages.items()]
+        keys = sorted({key for _, _, counters in rows for key in counters})
+        with open(base + '.csv', 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['target', 'stage'] + keys)
+            for target, name, counters in rows:
+                writer.writerow([target, name] + [
+                    round(counters[k], 4) if isinstance(counters.get(k), float) else counters.get(k, '')
+                    for k in keys
+                ])
+        return base + '.json'
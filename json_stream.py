@@ -0,0 +1,107 @@
+import json
+
+
+class JsonArrayStream:
+    """Incrementally pull complete objects out of a JSON array embedded in streamed text.
+
+    Text before the array (preambles, markdown fences) is skipped, and objects that
+    are cut off by a truncated stream are dropped while earlier ones are kept.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.text = []
+        self.pos = 0
+        self.in_array = False
+        self.finished = False
+        self.found = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.start = None
+
+    def _find_array_start(self):
+        while True:
+            i = self.buffer.find('[', self.pos)
+            if i == -1:
+                self.pos = len(self.buffer)
+                return False
+            rest = self.buffer[i + 1:].lstrip()
+            if not rest:
+                # Need more text to tell an array from a stray bracket
+                self.pos = i
+                return False
+            if rest[0] in '{]':
+                self.in_array = True
+                self.found = True
+                self.pos = i + 1
+                return True
+            self.pos = i + 1
+
+    def feed(self, chunk):
+        """Add streamed text; returns the objects completed by it."""
+        self.text.append(chunk)
+        if self.finished:
+            return []
+        self.buffer += chunk
+        if not self.in_array and not self._find_array_start():
+            return []
+
+        items = []
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf):
+            c = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = True
+            elif c == '{':
+                if self.depth == 0:
+                    self.start = i
+                self.depth += 1
+            elif c == '}' and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        item = json.loads(buf[self.start:i + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self.start = None
+            elif c == ']' and self.depth == 0:
+                self.finished = True
+                i += 1
+                break
+            i += 1
+
+        # Drop consumed text, keeping any partial object
+        keep_from = self.start if self.start is not None else i
+        self.buffer = buf[keep_from:]
+        if self.start is not None:
+            self.start = 0
+        self.pos = i - keep_from
+        return items
+
+    def fallback(self):
+        """Parse the whole text conventionally if no array was ever found."""
+        if self.found:
+            return []
+        content = ''.join(self.text).replace("```json", "").replace("```", "").strip()
+        try:
+            parsed = json.loads(content)
+        except json.JSONDecodeError:
+            return []
+        return [item for item in parsed if isinstance(item, dict)] if isinstance(parsed, list) else []
+
+
+def parse_json_array(content):
+    """Parse a complete response the same tolerant way as a stream."""
+    stream = JsonArrayStream()
+    return stream.feed(content or '') or stream.fallback()
@@ -0,0 +1,150 @@
+import importlib.util
+import threading
+from contextlib import nullcontext
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+# Prefer the C-based lxml parser when it is installed
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+
+class LinkExtractor:
+    """Fetch and parse each page once per run, classifying its links for every rule set.
+
+    matcher has the rule names in `rules` and a match(text) returning the names that
+    match (e.g. relevance.RuleMatcher); scan() can also classify with a per-target
+    matcher. With a snapshot store, only links that are new or whose text changed
+    since the previous run are matched (the new snapshots are stored by the store's
+    commit()); per-page deltas are kept in `deltas`, and pages seen or feeds read
+    for the first time are listed in `baselines`. With a feed reader
+    (feeds.FeedReader), pages that have a feed or sitemap are read from it and only
+    pages without one are scanned. An optional profiler
+    (instrumentation.RunProfiler) times this as the 'feed' and 'parse' stages.
+    """
+
+    def __init__(self, matcher, fetch, snapshots=None, canonicalize=None, profiler=None, feeds=None):
+        self.matcher = matcher
+        self.fetch = fetch
+        self.snapshots = snapshots
+        self.canonicalize = canonicalize or (lambda url: url)
+        self.profiler = profiler
+        self.feeds = feeds
+        self.deltas = {}
+        self.baselines = set()
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._scans = {}
+
+    def _url_lock(self, url):
+        with self._lock:
+            lock = self._url_locks.get(url)
+            if lock is None:
+                lock = threading.Lock()
+                self._url_locks[url] = lock
+            return lock
+
+    def anchors(self, base_url, content):
+        """Return [(link text, absolute URL), ...] for every <a href> in an HTML document."""
+        soup = BeautifulSoup(content, HTML_PARSER, parse_only=SoupStrainer('a'))
+        links = []
+        for link in soup.find_all('a'):
+            href = link.get('href')
+            if href:
+                links.append((link.get_text(strip=True), urljoin(base_url, href)))
+        return links
+
+    def classify(self, links, matcher=None):
+        """Return {rule name: [(link text, absolute URL, change), ...]} for matching links.
+
+        links: [(link text, absolute URL, change), ...] as returned by links().
+        """
+        matcher = matcher or self.matcher
+        hits = {name: [] for name in matcher.rules}
+        seen = {name: set() for name in matcher.rules}
+        for text, full_url, change in links:
+            matched = matcher.match(text)
+            for name in matched:
+                if full_url not in seen[name]:
+                    seen[name].add(full_url)
+                    hits[name].append((text, full_url, change))
+        return hits
+
+    def extract(self, base_url, content):
+        """[(link text, absolute URL, change), ...] of a document, limited to links added or
+        changed since the last snapshot."""
+        links = self.anchors(base_url, content)
+        if self.snapshots is None:
+            # Without snapshots every link looks new, so none of them is known to be fresh
+            with self._lock:
+                self.baselines.add(base_url)
+            return [(text, full_url, 'added') for text, full_url in links]
+
+        # One entry per canonical URL; all of its anchor texts form the compared text
+        texts = {}
+        for text, full_url in links:
+            texts.setdefault(self.canonicalize(full_url), set()).add(text)
+        if not self.snapshots.known(base_url):
+            with self._lock:
+                self.baselines.add(base_url)
+        added, changed, removed = self.snapshots.diff(
+            base_url, {url: '\n'.join(sorted(t)) for url, t in texts.items()}, content
+        )
+        status = dict.fromkeys(added, 'added')
+        status.update(dict.fromkeys(changed, 'changed'))
+        with self._lock:
+            self.deltas[base_url] = {'added': len(added), 'changed': len(changed), 'removed': removed}
+
+        fresh = []
+        for text, full_url in links:
+            change = status.get(self.canonicalize(full_url))
+            if change:
+                fresh.append((text, full_url, change))
+        return fresh
+
+    def _stage(self, name):
+        return self.profiler.stage(name) if self.profiler else nullcontext()
+
+    def scan(self, url, matcher=None, sitemaps=True):
+        """Classified links for url, or None if the page is unchanged since the last run."""
+        links = self.links(url, sitemaps)
+        return None if links is None else self.classify(links, matcher)
+
+    def links(self, url, sitemaps=True):
+        """New or changed [(link text, absolute URL, change), ...] of url, or None if unchanged.
+
+        sitemaps=False keeps a sitemap from standing in for the page's anchors.
+        """
+        key = (url, sitemaps)
+        with self._url_lock(url):
+            if key in self._scans:
+                return self._scans[key]
+
+            if self.feeds is not None:
+                with self._stage('feed'):
+                    first_read = not self.feeds.known(url)
+                    entries = self.feeds.entries(url, sitemaps)
+                if entries is not None:
+                    # Feed entries are already limited to the ones new since the last run
+                    # (on a first read, to the ones within the feed reader's max_age)
+                    with self._lock:
+                        if first_read:
+                            self.baselines.add(url)
+                        self.deltas[url] = {'added': len(entries), 'changed': 0, 'removed': 0}
+                    self._scans[key] = [(title, urljoin(url, link), 'added') for title, link, _ in entries]
+                    return self._scans[key]
+
+            # The anchor scan is shared by every caller that ends up without a feed
+            page_key = (url, None)
+            if page_key not in self._scans:
+                page = self.fetch(url)
+                # A 304 only means nothing is new if the snapshot of that body was committed;
+                # after a failed run the cached body is scanned again
+                if page.unchanged and (self.snapshots is None or self.snapshots.is_current(url, page.content)):
+                    self._scans[page_key] = None
+                else:
+                    with self._stage('parse'):
+                        self._scans[page_key] = self.extract(url, page.content)
+            self._scans[key] = self._scans[page_key]
+            return self._scans[key]
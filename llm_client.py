@@ -0,0 +1,260 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+
+from openai import AsyncOpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+
+
+# Errors worth retrying: throttling, timeouts, dropped connections and 5xx
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError, asyncio.TimeoutError)
+
+
+class AsyncRateBudget:
+    """Per-minute budget (requests or tokens) refilled continuously, for use on one event loop."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, amount=1.0):
+        if self.rate <= 0:
+            return
+        amount = min(float(amount), self.capacity)
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+        # Reserve before sleeping so concurrent callers queue behind each other
+        self.available -= amount
+        if self.available < 0:
+            await asyncio.sleep(-self.available / self.rate)
+
+
+class ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = []
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def estimate_message_tokens(messages):
+    """Rough prompt size: ~1 token per non-ASCII character, ~4 ASCII characters per token."""
+    text = ''.join(str(m.get('content', '')) for m in messages)
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+class GrokClient:
+    """Async Grok (OpenAI-compatible) client shared by every LLM call.
+
+    Requests run on a private event loop thread, so synchronous callers (including
+    worker threads) can use complete() while in-flight requests, requests/tokens
+    per minute and retries are governed in one place.
+    """
+
+    def __init__(self, api_key, base_url="https://api.x.ai/v1", max_in_flight=4, rpm=60, tpm=200000,
+                 timeout=60, deadline=180, max_retries=4, backoff=1.0, completion_tokens=800):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.completion_tokens = completion_tokens
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='grok-client', daemon=True)
+        self._thread.start()
+
+        # Retries are handled here so they respect the shared budgets
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout)
+        self._semaphore = asyncio.Semaphore(max(1, max_in_flight))
+        self._rpm = AsyncRateBudget(rpm)
+        self._tpm = AsyncRateBudget(tpm)
+
+    def _model_stats(self, model):
+        with self._stats_lock:
+            return self.stats.setdefault(model, ModelStats())
+
+    def _retry_delay(self, error, attempt):
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = self.backoff * (2 ** attempt)
+        # Full jitter keeps parallel callers from retrying in lockstep
+        return random.uniform(delay / 2, delay)
+
+    async def _acquire_slot(self, model, give_up_at):
+        """Wait for an in-flight slot, but no longer than the call's deadline allows."""
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=max(0.0, give_up_at - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"{model} request exceeded its deadline waiting for a slot") from None
+
+    async def _create(self, model, messages, give_up_at, limit_in_flight=True, **kwargs):
+        """Issue one completion request with budgeting, retries and an overall deadline (monotonic time)."""
+        stats = self._model_stats(model)
+        tokens = estimate_message_tokens(messages) + self.completion_tokens
+
+        for attempt in range(self.max_retries + 1):
+            await self._rpm.acquire(1)
+            await self._tpm.acquire(tokens)
+
+            def request():
+                # Measured once the slot is held, so time queued behind max_in_flight counts
+                remaining = give_up_at - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"{model} request exceeded its deadline")
+                return asyncio.wait_for(
+                    self._client.chat.completions.create(model=model, messages=messages, **kwargs),
+                    timeout=min(self.timeout, remaining)
+                )
+
+            try:
+                if limit_in_flight:
+                    await self._acquire_slot(model, give_up_at)
+                    try:
+                        return await request()
+                    finally:
+                        self._semaphore.release()
+                return await request()
+            except RETRYABLE_ERRORS as e:
+                with self._stats_lock:
+                    stats.errors += 1
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if time.monotonic() + delay >= give_up_at:
+                    raise
+                print(f"  {model} call failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+                with self._stats_lock:
+                    stats.retries += 1
+            await asyncio.sleep(delay)
+
+    def _record(self, model, started, usage):
+        stats = self._model_stats(model)
+        with self._stats_lock:
+            stats.calls += 1
+            stats.latencies.append(time.monotonic() - started)
+            stats.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+            stats.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    async def acomplete(self, model, messages, deadline=None, **kwargs):
+        """Create a chat completion with budgeting, retries and an overall deadline."""
+        started = time.monotonic()
+        response = await self._create(model, messages, started + (deadline or self.deadline), **kwargs)
+        self._record(model, started, getattr(response, 'usage', None))
+        return response
+
+    async def astream(self, model, messages, deadline=None, **kwargs):
+        """Yield content deltas of a streamed completion.
+
+        Retries only happen before the first chunk; the in-flight slot is held until
+        the stream ends.
+        """
+        started = time.monotonic()
+        give_up_at = started + (deadline or self.deadline)
+        usage = None
+        await self._acquire_slot(model, give_up_at)
+        try:
+            stream = await self._create(model, messages, give_up_at, limit_in_flight=False, stream=True, **kwargs)
+            try:
+                iterator = stream.__aiter__()
+                while True:
+                    remaining = give_up_at - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError(f"{model} stream exceeded its deadline")
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=min(self.timeout, remaining))
+                    except StopAsyncIteration:
+                        break
+                    usage = getattr(chunk, 'usage', None) or usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except Exception:
+                stats = self._model_stats(model)
+                with self._stats_lock:
+                    stats.errors += 1
+                raise
+            finally:
+                await stream.close()
+        finally:
+            self._semaphore.release()
+        self._record(model, started, usage)
+
+    def complete(self, model, messages, **kwargs):
+        """Blocking wrapper around acomplete(), safe to call from any thread."""
+        future = asyncio.run_coroutine_threadsafe(self.acomplete(model, messages, **kwargs), self._loop)
+        return future.result()
+
+    def stream(self, model, messages, **kwargs):
+        """Blocking generator over astream() deltas, safe to call from any thread."""
+        deltas = queue.Queue()
+
+        async def pump():
+            try:
+                async for delta in self.astream(model, messages, **kwargs):
+                    deltas.put(('data', delta))
+                deltas.put(('end', None))
+            except BaseException as e:
+                deltas.put(('error', e))
+                raise
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                kind, value = deltas.get()
+                if kind == 'data':
+                    yield value
+                elif kind == 'end':
+                    return
+                else:
+                    raise value
+        finally:
+            # Stop the request if the caller abandons the stream early
+            future.cancel()
+
+    def stats_dict(self):
+        with self._stats_lock:
+            return {
+                model: {
+                    'calls': s.calls,
+                    'retries': s.retries,
+                    'errors': s.errors,
+                    'latency_p50': round(s.percentile(0.5), 3),
+                    'latency_p95': round(s.percentile(0.95), 3),
+                    'prompt_tokens': s.prompt_tokens,
+                    'completion_tokens': s.completion_tokens,
+                }
+                for model, s in self.stats.items()
+            }
+
+    def report(self):
+        lines = []
+        with self._stats_lock:
+            for model, s in sorted(self.stats.items()):
+                lines.append(
+                    f"LLM {model}: {s.calls} calls, {s.retries} retries, {s.errors} errors, "
+                    f"p50 {s.percentile(0.5):.1f}s / p95 {s.percentile(0.95):.1f}s, "
+                    f"{s.prompt_tokens} prompt + {s.completion_tokens} completion tokens"
+                )
+        return '\n'.join(lines) or "LLM: no calls"
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
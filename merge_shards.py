@@ -0,0 +1,24 @@
+"""Merge the shard files of a sharded run into the Data sheet and send one digest.
+
+Each runner of a sharded run (SHARD_INDEX / SHARD_COUNT, see scraper.py) writes
+its new, summarized items to SHARD_DIR. This step dedups them across shards and
+against the sheet, appends the rows in one batched write and emails once.
+
+    python merge_shards.py [directory]
+"""
+import sys
+
+import scraper
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    monitor = scraper.CompetitorMonitor()
+    try:
+        monitor.merge_shards(argv[0] if argv else scraper.SHARD_DIR)
+    finally:
+        monitor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+
+# Result of a cached fetch: raw body plus whether it matches the previous run
+PageResult = namedtuple('PageResult', ['content', 'unchanged'])
+
+
+class PageCache:
+    """Persistent HTTP page cache keyed by URL, using ETag/Last-Modified revalidation."""
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024, max_age_days=30):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        # Pages already fetched during this run, so a URL used by several scanners
+        # is downloaded once and compared against the previous run, not itself
+        self._this_run = {}
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                size INTEGER,
+                fetched_at REAL
+            )
+        """)
+        self._db.commit()
+
+    def _url_lock(self, url):
+        with self._lock:
+            lock = self._url_locks.get(url)
+            if lock is None:
+                lock = threading.Lock()
+                self._url_locks[url] = lock
+            return lock
+
+    def get(self, url):
+        """Return the cached entry for url as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, content_hash FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {'body': row[0], 'etag': row[1], 'last_modified': row[2], 'content_hash': row[3]}
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Store a page body and its validators."""
+        content_hash = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, content_hash, len(body), time.time())
+            )
+            self._db.commit()
+        return content_hash
+
+    def _touch(self, url):
+        with self._lock:
+            self._db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def fetch(self, url, headers, timeout, opener):
+        """Fetch url with a conditional GET through opener (a requests.get-like callable)."""
+        with self._url_lock(url):
+            if url in self._this_run:
+                return self._this_run[url]
+
+            entry = self.get(url)
+            request_headers = dict(headers)
+            if entry:
+                if entry['etag']:
+                    request_headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    request_headers['If-Modified-Since'] = entry['last_modified']
+
+            response = opener(url, headers=request_headers, timeout=timeout)
+            if response.status_code == 304 and entry:
+                self._touch(url)
+                result = PageResult(entry['body'], True)
+            else:
+                response.raise_for_status()
+                body = response.content
+                content_hash = self.store(
+                    url, body,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified')
+                )
+                result = PageResult(body, entry is not None and entry['content_hash'] == content_hash)
+
+            with self._lock:
+                if result.unchanged:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            self._this_run[url] = result
+            return result
+
+    def evict(self):
+        """Drop entries older than max_age, then the oldest ones until under max_bytes."""
+        with self._lock:
+            self._db.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.max_age,))
+            rows = self._db.execute("SELECT url, size FROM pages ORDER BY fetched_at DESC").fetchall()
+            total = 0
+            stale = []
+            for url, size in rows:
+                total += size or 0
+                if total > self.max_bytes:
+                    stale.append((url,))
+            if stale:
+                self._db.executemany("DELETE FROM pages WHERE url = ?", stale)
+            self._db.commit()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': round(self.hit_rate(), 3)}
+
+    def report(self):
+        return f"Page cache: {self.hits} hits / {self.misses} misses (hit rate {self.hit_rate():.0%})"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
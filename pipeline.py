@@ -0,0 +1,191 @@
+import heapq
+import queue
+import threading
+import time
+
+
+class Stage:
+    """One pipeline step: fn runs on `workers` threads fed by a bounded queue.
+
+    With batch_size > 1, fn receives a list of up to batch_size payloads (collected
+    for at most `linger` seconds) and must return a list of the same length.
+    With ordered=True, a single worker processes items strictly in input order.
+    fn may return None to drop an item. An exception in fn drops the item too,
+    unless the stage is critical: then the stage stops processing and
+    Pipeline.run() raises the error once the pipeline has drained.
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=16, batch_size=1, linger=0.2, ordered=False,
+                 critical=False):
+        self.name = name
+        self.fn = fn
+        self.workers = 1 if ordered else max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self.ordered = ordered
+        self.critical = critical
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'busy_seconds': round(self.busy, 3),
+                'avg_seconds': round(self.busy / self.processed, 3) if self.processed else 0.0,
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_depth,
+            }
+
+
+class Pipeline:
+    """Run items through a chain of stages connected by bounded queues.
+
+    Throughput is set by the slowest stage rather than the sum of all stages, and
+    full queues apply backpressure to the stages before them.
+    """
+
+    _DONE = object()
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.results = []
+        self.error = None
+        self._results_lock = threading.Lock()
+
+    def _put(self, index, envelope):
+        if index == len(self.stages):
+            if envelope[1] is not None:
+                with self._results_lock:
+                    self.results.append(envelope)
+            return
+        stage = self.stages[index]
+        stage.queue.put(envelope)
+        depth = stage.queue.qsize()
+        with stage._lock:
+            stage.max_depth = max(stage.max_depth, depth)
+
+    def _take_batch(self, stage, first):
+        batch = [first]
+        deadline = time.monotonic() + stage.linger
+        while len(batch) < stage.batch_size:
+            try:
+                item = stage.queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is self._DONE:
+                # Leave the end marker for this or a sibling worker
+                stage.queue.put(item)
+                break
+            batch.append(item)
+        return batch
+
+    def _apply(self, stage, envelopes):
+        """Run stage.fn on the live payloads of envelopes; dropped items pass through."""
+        live = [e for e in envelopes if e[1] is not None]
+        if stage.critical and self.error is not None:
+            # A critical stage already failed: pass nothing further through it
+            live = []
+        outputs = []
+        if live:
+            started = time.monotonic()
+            try:
+                if stage.batch_size > 1:
+                    outputs = stage.fn([e[1] for e in live])
+                else:
+                    outputs = [stage.fn(live[0][1])]
+            except Exception as e:
+                print(f"  Pipeline stage '{stage.name}' failed: {e}")
+                outputs = [None] * len(live)
+                with stage._lock:
+                    stage.errors += 1
+                if stage.critical:
+                    with self._results_lock:
+                        self.error = self.error or e
+            with stage._lock:
+                stage.busy += time.monotonic() - started
+                stage.processed += len(live)
+                stage.dropped += sum(1 for o in outputs if o is None)
+        by_seq = {e[0]: o for e, o in zip(live, outputs)}
+        return [(e[0], by_seq.get(e[0])) for e in envelopes]
+
+    def _worker(self, index, finished):
+        stage = self.stages[index]
+        pending = []
+        next_seq = 0
+        while True:
+            item = stage.queue.get()
+            if item is self._DONE:
+                break
+            if stage.ordered:
+                heapq.heappush(pending, item)
+                while pending and pending[0][0] == next_seq:
+                    for out in self._apply(stage, [heapq.heappop(pending)]):
+                        self._put(index + 1, out)
+                    next_seq += 1
+                continue
+            batch = self._take_batch(stage, item) if stage.batch_size > 1 else [item]
+            for out in self._apply(stage, batch):
+                self._put(index + 1, out)
+        finished()
+
+    def run(self, items):
+        """Push items through every stage; returns final payloads in input order.
+
+        Raises the first error of a critical stage after all workers have stopped.
+        """
+        self.results = []
+        self.error = None
+        threads = []
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+
+            def finished(index=index, remaining=remaining, lock=lock):
+                # The last worker of a stage tells every worker of the next stage to stop
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and index + 1 < len(self.stages):
+                    for _ in range(self.stages[index + 1].workers):
+                        self.stages[index + 1].queue.put(self._DONE)
+
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(index, finished),
+                    name=f"pipeline-{stage.name}-{n}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        for seq, item in enumerate(items):
+            self._put(0, (seq, item))
+        for _ in range(self.stages[0].workers):
+            self.stages[0].queue.put(self._DONE)
+        for thread in threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+        return [payload for _, payload in sorted(self.results, key=lambda e: e[0])]
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def report(self):
+        lines = ["Pipeline stages:"]
+        for name, s in self.stats().items():
+            lines.append(
+                f"  {name}: {s['processed']} items on {s['workers']} workers, "
+                f"{s['busy_seconds']}s busy ({s['avg_seconds']}s/item), "
+                f"max queue {s['max_queue_depth']}, dropped {s['dropped']}, errors {s['errors']}"
+            )
+        return '\n'.join(lines)
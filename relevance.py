@@ -0,0 +1,214 @@
+import re
+import threading
+import unicodedata
+from collections import deque
+
+
+# Optional Config sheet columns with per-target rules; empty cells fall back to the defaults
+KEYWORD_COLUMNS = {'news': 'Keywords (Optional)', 'ir': 'IR Keywords (Optional)'}
+THRESHOLD_COLUMN = 'Relevance Threshold (Optional)'
+PHRASE_SEPARATORS = re.compile(r'[,、\n]+')
+
+
+def normalize(text):
+    """Fold width and case so 'Ｒｅｐｏｒｔ', 'REPORT' and 'report' match alike."""
+    return unicodedata.normalize('NFKC', text or '').casefold()
+
+
+def parse_phrases(value):
+    """[(phrase, weight), ...] from a cell like '花粉症:3, オンライン診療, 求人:-5' (weight defaults to 1)."""
+    phrases = []
+    for part in PHRASE_SEPARATORS.split(str(value or '').replace('：', ':')):
+        part = part.strip()
+        phrase, sep, weight = part.rpartition(':')
+        if sep and phrase.strip():
+            try:
+                phrases.append((phrase.strip(), float(weight)))
+                continue
+            except ValueError:
+                pass  # the colon is part of the phrase itself
+        if part:
+            phrases.append((part, 1.0))
+    return phrases
+
+
+class Automaton:
+    """Aho-Corasick automaton: finds which of many patterns occur in a text in one pass over it."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (index,)
+
+        # Breadth-first failure links; each state also reports the patterns of its suffixes
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Indices of the patterns that occur in text (each reported once)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class RuleMatcher:
+    """Link text matcher view of the engine for one company (see link_extractor.LinkExtractor)."""
+
+    def __init__(self, engine, company):
+        self.engine = engine
+        self.company = company
+        self.rules = {rule: engine.keywords(company, rule) for rule in engine.rules}
+
+    def match(self, text):
+        """Rule names whose phrases in text add up to a positive weight."""
+        if not text:
+            return set()
+        return {rule for rule, score in self.engine.scores(text, self.company).items() if score > 0}
+
+
+class RelevanceEngine:
+    """Weighted keyword/phrase relevance for every target, compiled once into one automaton.
+
+    defaults: {rule: [(phrase, weight), ...]} used by targets without their own
+    rules; profiles: {company: {rule: [(phrase, weight), ...]}}. A text's score
+    for a rule is the sum of the weights of the distinct phrases it contains
+    (negative weights mark noise); it is relevant at or above the threshold.
+    thresholds: {company: threshold} for the rule sets that company defines
+    itself; its rules that fall back to the defaults keep the default threshold.
+    """
+
+    def __init__(self, defaults, profiles=None, threshold=1.0, thresholds=None):
+        self.rules = list(defaults)
+        self.threshold = threshold
+        self.thresholds = dict(thresholds or {})
+        self.rule_sets = {(None, rule): list(phrases) for rule, phrases in defaults.items()}
+        for company, rules in (profiles or {}).items():
+            for rule, phrases in rules.items():
+                self.rule_sets[(company, rule)] = list(phrases)
+
+        # One automaton over every phrase; each pattern carries its weight per rule set
+        patterns = {}
+        for key, phrases in self.rule_sets.items():
+            for phrase, weight in phrases:
+                patterns.setdefault(normalize(phrase), {})[key] = weight
+        self.automaton = Automaton(patterns)
+        self.weights = list(patterns.values())
+
+        self.scored = 0
+        self.passed = 0
+        self._lock = threading.Lock()
+        self._matchers = {}
+
+    @classmethod
+    def from_config(cls, targets, defaults, threshold=1.0):
+        """Engine for the Config rows: per-target keyword columns and threshold override the defaults."""
+        profiles = {}
+        thresholds = {}
+        for target in targets:
+            company = target.get('Company Name')
+            if not company:
+                continue
+            rules = {rule: parse_phrases(target.get(column)) for rule, column in KEYWORD_COLUMNS.items()}
+            rules = {rule: phrases for rule, phrases in rules.items() if phrases}
+            if rules:
+                profiles[company] = rules
+            value = str(target.get(THRESHOLD_COLUMN, '') or '').strip()
+            if value:
+                try:
+                    thresholds[company] = float(value)
+                except ValueError:
+                    print(f"Ignoring invalid relevance threshold {value!r} for {company}")
+                    continue
+                if company not in profiles:
+                    print(f"Relevance threshold for {company} has no effect: it only applies to "
+                          f"the company's own keyword columns")
+        return cls(defaults, profiles, threshold, thresholds)
+
+    def _key(self, company, rule):
+        return (company, rule) if (company, rule) in self.rule_sets else (None, rule)
+
+    def keywords(self, company, rule):
+        """Phrases with a positive weight for the company's rule (e.g. for search prompts)."""
+        return [phrase for phrase, weight in self.rule_sets.get(self._key(company, rule), []) if weight > 0]
+
+    def matcher(self, company=None):
+        """Link text matcher for a company (see RuleMatcher)."""
+        with self._lock:
+            matcher = self._matchers.get(company)
+            if matcher is None:
+                matcher = self._matchers[company] = RuleMatcher(self, company)
+            return matcher
+
+    def threshold_for(self, company, rule):
+        """Threshold of the company's rule: its own override only applies to rule sets it configured."""
+        if (company, rule) in self.rule_sets:
+            return self.thresholds.get(company, self.threshold)
+        return self.threshold
+
+    def scores(self, text, company=None):
+        """{rule: score} of text for the company's rule sets."""
+        found = self.automaton.find(normalize(text))
+        keys = {rule: self._key(company, rule) for rule in self.rules}
+        totals = dict.fromkeys(self.rules, 0.0)
+        for index in found:
+            weights = self.weights[index]
+            for rule, key in keys.items():
+                totals[rule] += weights.get(key, 0.0)
+        return totals
+
+    def score(self, text, company, rule):
+        """(score, matched phrases) of text for one company and rule."""
+        key = self._key(company, rule)
+        found = self.automaton.find(normalize(text))
+        matched = [(self.automaton.patterns[i], self.weights[i][key]) for i in sorted(found)
+                   if key in self.weights[i]]
+        return sum(weight for _, weight in matched), [phrase for phrase, _ in matched]
+
+    def score_batch(self, items):
+        """[(score, matched phrases, relevant), ...] for items [(text, company, rule), ...]."""
+        results = []
+        for text, company, rule in items:
+            score, phrases = self.score(text, company, rule)
+            results.append((score, phrases, score >= self.threshold_for(company, rule)))
+        with self._lock:
+            self.scored += len(results)
+            self.passed += sum(1 for r in results if r[2])
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {'patterns': len(self.automaton.patterns), 'profiles': len(self.rule_sets),
+                    'scored': self.scored, 'passed': self.passed}
+
+    def report(self):
+        s = self.stats()
+        return (f"Relevance: {s['passed']} of {s['scored']} items above threshold "
+                f"({s['patterns']} phrases in {s['profiles']} rule sets)")
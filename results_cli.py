@@ -0,0 +1,100 @@
+"""Query the local results store, or sync it with the Data sheet.
+
+Examples:
+    python results_cli.py count --by company --source ir --this-month   # new IR items per company
+    python results_cli.py count --by source                             # top sources by volume
+    python results_cli.py list --company ユビー --limit 10
+    python results_cli.py import-sheet                                  # seed the store from the sheet
+    python results_cli.py rebuild-sheet --yes                           # rewrite the sheet from the store
+"""
+import argparse
+import sys
+import time
+from datetime import date
+
+import scraper
+
+
+def source_label(value):
+    """Accept the short source names (x, news, ir) as well as the sheet labels."""
+    return scraper.SOURCE_LABELS.get(value.lower(), value) if value else value
+
+
+def filters(args):
+    since = args.since
+    if args.this_month:
+        since = date.today().replace(day=1).isoformat()
+    return {'company': args.company, 'source': source_label(args.source), 'since': since, 'until': args.until}
+
+
+def print_table(rows, headers):
+    widths = [max([len(str(h))] + [len(str(r[i])) for r in rows]) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def import_sheet(monitor, store):
+    worksheet = monitor.sheets_io.find_worksheet(monitor.sheet, "Data")
+    if worksheet is None:
+        print("No Data sheet found.")
+        return
+    rows = monitor.sheets_io.call(worksheet.get_all_values)[1:]
+    print(f"Imported {store.replace_all(rows)} rows from the Data sheet into {store.path}")
+
+
+def rebuild_sheet(monitor, store, confirmed):
+    rows = store.rows()
+    if not confirmed:
+        print(f"Would replace the Data sheet with {len(rows)} rows from {store.path}; pass --yes to do it.")
+        return
+    worksheet = monitor.data_worksheet()
+    monitor.sheets_io.call(worksheet.clear)
+    monitor.sheets_io.append_rows(worksheet, [scraper.DATA_HEADERS] + rows)
+    print(f"Rebuilt the Data sheet with {len(rows)} rows")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local results store.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    count = commands.add_parser('count', help='number of results grouped by a column')
+    count.add_argument('--by', choices=['company', 'source', 'date', 'month'], default='company')
+    listing = commands.add_parser('list', help='stored results, newest first')
+    for sub in (count, listing):
+        sub.add_argument('--company')
+        sub.add_argument('--source', help='x, news, ir or a sheet Source label')
+        sub.add_argument('--since', help='YYYY-MM-DD (inclusive)')
+        sub.add_argument('--until', help='YYYY-MM-DD (exclusive)')
+        sub.add_argument('--this-month', action='store_true')
+        sub.add_argument('--limit', type=int, default=None if sub is count else 20)
+    commands.add_parser('import-sheet', help='replace the store with the rows in the Data sheet')
+    rebuild = commands.add_parser('rebuild-sheet', help='rewrite the Data sheet from the store')
+    rebuild.add_argument('--yes', action='store_true', help='really clear and rewrite the sheet')
+    args = parser.parse_args(argv)
+
+    # Backends are lazy: queries only open the local store, sheet commands also open the sheet
+    monitor = scraper.CompetitorMonitor()
+    store = monitor.results_store
+    try:
+        if args.command == 'import-sheet':
+            import_sheet(monitor, store)
+        elif args.command == 'rebuild-sheet':
+            rebuild_sheet(monitor, store, args.yes)
+        else:
+            started = time.perf_counter()
+            if args.command == 'count':
+                rows = store.counts(by=args.by, limit=args.limit, **filters(args))
+                headers = [args.by, 'items']
+            else:
+                rows = store.rows(limit=args.limit, newest_first=True, **filters(args))
+                headers = scraper.DATA_HEADERS
+            elapsed = (time.perf_counter() - started) * 1000
+            print_table(rows, headers)
+            print(f"({len(rows)} rows, {elapsed:.1f} ms)", file=sys.stderr)
+    finally:
+        monitor.close()
+
+
+if __name__ == "__main__":
+    main()
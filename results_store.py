@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import time
+
+
+# Column order of a Data sheet row (scraper.DATA_HEADERS)
+ROW_FIELDS = ('date', 'company', 'source', 'title', 'url', 'summary', 'article_summary')
+GROUP_COLUMNS = {'company': 'company', 'source': 'source', 'date': 'date', 'month': 'substr(date, 1, 7)'}
+
+
+class ResultsStore:
+    """Local, indexed history of every result row written to the Data sheet."""
+
+    def __init__(self, path, canonicalize=None):
+        self.path = path
+        self.canonicalize = canonicalize or (lambda url: url)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                date TEXT,
+                company TEXT,
+                source TEXT,
+                title TEXT,
+                url TEXT,
+                canonical_url TEXT,
+                summary TEXT,
+                article_summary TEXT,
+                saved_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS results_company_date ON results (company, date);
+            CREATE INDEX IF NOT EXISTS results_source_date ON results (source, date);
+            CREATE INDEX IF NOT EXISTS results_date ON results (date);
+            CREATE INDEX IF NOT EXISTS results_canonical_url ON results (canonical_url);
+        """)
+        self._db.commit()
+
+    def _records(self, rows):
+        now = time.time()
+        for row in rows:
+            values = (list(row) + [''] * len(ROW_FIELDS))[:len(ROW_FIELDS)]
+            values = [str(v) if v is not None else '' for v in values]
+            url = values[4].strip()
+            yield values[:5] + [self.canonicalize(url) if url else ''] + values[5:] + [now]
+
+    def add_rows(self, rows):
+        """Insert Data sheet rows (see ROW_FIELDS); returns the number inserted."""
+        records = list(self._records(rows))
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO results (date, company, source, title, url, canonical_url, summary, "
+                "article_summary, saved_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records
+            )
+            self._db.commit()
+        return len(records)
+
+    def replace_all(self, rows):
+        """Replace the whole history, e.g. with the rows currently in the Data sheet."""
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+        return self.add_rows(rows)
+
+    @staticmethod
+    def _where(company=None, source=None, since=None, until=None):
+        clauses, params = [], []
+        for column, op, value in (('company', '=', company), ('source', '=', source),
+                                  ('date', '>=', since), ('date', '<', until)):
+            if value:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def counts(self, by='company', company=None, source=None, since=None, until=None, limit=None):
+        """[(group, count), ...] ordered by count, for by in company/source/date/month."""
+        column = GROUP_COLUMNS[by]
+        where, params = self._where(company, source, since, until)
+        sql = f"SELECT {column} AS grp, COUNT(*) AS n FROM results{where} GROUP BY grp ORDER BY n DESC, grp"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def rows(self, company=None, source=None, since=None, until=None, limit=None, newest_first=False):
+        """Stored results as Data sheet rows, in insertion order (or newest first)."""
+        where, params = self._where(company, source, since, until)
+        sql = (f"SELECT {', '.join(ROW_FIELDS)} FROM results{where} "
+               f"ORDER BY {'date DESC, id DESC' if newest_first else 'id'}")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [list(row) for row in self._db.execute(sql, params).fetchall()]
+
+    def contains(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM results WHERE canonical_url = ? LIMIT 1", (self.canonicalize(url),)
+            ).fetchone()
+        return row is not None
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import time
+
+
+HOUR = 3600
+
+
+class PollScheduler:
+    """Adaptive polling intervals per (company, source).
+
+    A source that produced something new is polled twice as often (down to
+    min_interval); a quiet one backs off exponentially (up to max_interval).
+    """
+
+    def __init__(self, path, min_interval=6 * HOUR, initial_interval=24 * HOUR, max_interval=14 * 24 * HOUR):
+        self.min_interval = min_interval
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS schedule (
+                company TEXT,
+                source TEXT,
+                last_check REAL,
+                last_change REAL,
+                interval REAL,
+                checks INTEGER,
+                changes INTEGER,
+                change_rate REAL,
+                PRIMARY KEY (company, source)
+            )
+        """)
+        self._db.commit()
+
+    def _state(self, company, source):
+        row = self._db.execute(
+            "SELECT last_check, last_change, interval, checks, changes, change_rate "
+            "FROM schedule WHERE company = ? AND source = ?", (company, source)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('last_check', 'last_change', 'interval', 'checks', 'changes', 'change_rate')
+        return dict(zip(keys, row))
+
+    def next_check(self, company, source):
+        """Unix time at which (company, source) is next due; 0 if never checked."""
+        with self._lock:
+            state = self._state(company, source)
+        if state is None:
+            return 0.0
+        # Allow a little slack so a cron run slightly early still picks the source up
+        return state['last_check'] + state['interval'] - 0.05 * state['interval']
+
+    def is_due(self, company, source, now=None):
+        return (now or time.time()) >= self.next_check(company, source)
+
+    def record(self, company, source, changed, now=None):
+        """Record a check and adapt the polling interval to whether it found anything new."""
+        now = now or time.time()
+        with self._lock:
+            state = self._state(company, source) or {
+                'last_check': now, 'last_change': None, 'interval': self.initial_interval,
+                'checks': 0, 'changes': 0, 'change_rate': 0.0,
+            }
+            if changed:
+                interval = max(self.min_interval, state['interval'] / 2)
+                last_change = now
+            else:
+                interval = min(self.max_interval, state['interval'] * 2)
+                last_change = state['last_change']
+            # Exponentially weighted share of checks that found something new
+            change_rate = 0.7 * state['change_rate'] + 0.3 * (1.0 if changed else 0.0)
+            self._db.execute(
+                "INSERT OR REPLACE INTO schedule VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (company, source, now, last_change, interval,
+                 state['checks'] + 1, state['changes'] + (1 if changed else 0), change_rate)
+            )
+            self._db.commit()
+        return interval
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,9 +1,12 @@
 import os
 import sys
+import re
 import json
 import glob
-import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import cached_property
+from urllib.parse import urlsplit
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -13,106 +16,376 @@ if sys.platform == 'win32':
     if user_site_packages:
         sys.path.append(user_site_packages[0])
 
-import requests
-import gspread
-from google.oauth2.service_account import Credentials
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from openai import OpenAI
 
+from page_cache import PageCache
+from summary_cache import SummaryCache
+from dedup_index import DedupIndex
+from results_store import ResultsStore
+from canonical import canonicalize_url, merge_near_duplicates
+from url_validator import UrlValidator
+from json_stream import JsonArrayStream, parse_json_array
+from pipeline import Pipeline, Stage
+from snapshot_store import SnapshotStore
+from scheduler import PollScheduler
+from feeds import FeedReader
+from article_text import extract_text_streaming
+from batch_summarizer import SYSTEM_PROMPT as SUMMARY_SYSTEM_PROMPT
+from batch_summarizer import pack_batches, single_prompt, batch_prompt, parse_batch_response
+from instrumentation import RunProfiler
+from backends import open_spreadsheet, SmtpMailer
+from shards import shard_of, write_shard, load_shards
+from relevance import RelevanceEngine, KEYWORD_COLUMNS, THRESHOLD_COLUMN
 
 # Load environment variables
 load_dotenv()
 
 # Constants
+# Default relevance phrases (weight 1 each); Config rows can set their own (see relevance.py)
 KEYWORDS = ["花粉症", "オンライン診療", "オンライン保険診療"]
+IR_KEYWORDS = ["決算", "Financial", "Report", "Presentation", "説明会", "有価証券報告書", "短信"]
 SERVICE_ACCOUNT_FILE = 'service_account.json'
+CONFIG_HEADERS = (["Company Name", "News URL", "X Query (Optional)", "IR URL (Optional)"]
+                  + list(KEYWORD_COLUMNS.values()) + [THRESHOLD_COLUMN])
+SOURCE_LABELS = {'x': 'X (Grok)', 'news': 'Website News', 'ir': 'IR'}
+DATA_HEADERS = ["Date", "Company", "Source", "Title", "URL", "Summary", "Article Summary"]
+# full, web-only, dry-run or config-only (see CompetitorMonitor)
+RUN_MODES = ('full', 'web-only', 'dry-run', 'config-only')
+RUN_MODE = os.getenv("RUN_MODE", "full").strip().lower()
+# Sharded runs: handle shard SHARD_INDEX of SHARD_COUNT (by Company Name hash) and write the
+# partial results to SHARD_DIR; merge_shards.py then saves and emails them once
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_DIR = os.getenv("SHARD_DIR", "shards")
+# OpenAI-compatible Grok endpoint and the SMTP relay used for the digest email
+GROK_BASE_URL = os.getenv("GROK_BASE_URL", "https://api.x.ai/v1")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+# Grok client limits: in-flight requests, per-minute budgets, per-attempt timeout and overall deadline
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+LLM_RPM = int(os.getenv("LLM_RPM", "60"))
+LLM_TPM = int(os.getenv("LLM_TPM", "200000"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "180"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "4"))
+# Sheets API pacing, append chunk size and checkpoint interval during save_results
+SHEETS_QUOTA_PER_MINUTE = int(os.getenv("SHEETS_QUOTA_PER_MINUTE", "55"))
+SHEETS_CHUNK_ROWS = int(os.getenv("SHEETS_CHUNK_ROWS", "500"))
+SHEETS_CHECKPOINT_ROWS = int(os.getenv("SHEETS_CHECKPOINT_ROWS", "50"))
+# save_results pipeline: article fetch workers and per-stage queue bound
+PIPELINE_FETCH_WORKERS = int(os.getenv("PIPELINE_FETCH_WORKERS", "8"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+VERBOSE = os.getenv("MONITOR_VERBOSE", "0") == "1"
+# Concurrency limits for the fetch stage (overridable via environment)
+MAX_WORKERS = int(os.getenv("MONITOR_MAX_WORKERS", "8"))
+MAX_PER_HOST = int(os.getenv("MONITOR_MAX_PER_HOST", "2"))
+# Shared HTTP client: connection pool size, retries and per-host request rate
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HOST_RATE_PER_SEC = float(os.getenv("HOST_RATE_PER_SEC", "2"))
+HOST_BURST = int(os.getenv("HOST_BURST", "4"))
+# Local state (HTTP cache etc.) persisted between runs
+CACHE_DIR = os.getenv("MONITOR_CACHE_DIR", ".monitor_cache")
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "200"))
+PAGE_CACHE_MAX_AGE_DAYS = int(os.getenv("PAGE_CACHE_MAX_AGE_DAYS", "30"))
+# Local indexed copy of every row written to the Data sheet (see results_cli.py)
+RESULTS_DB = os.getenv("RESULTS_DB", "")
+# Stream Grok X responses and parse the JSON array item by item
+X_STREAMING = os.getenv("X_STREAMING", "1") != "0"
+URL_CHECK_WORKERS = int(os.getenv("URL_CHECK_WORKERS", "8"))
+URL_VERDICT_TTL_HOURS = int(os.getenv("URL_VERDICT_TTL_HOURS", "72"))
+# Adaptive polling: only check sources whose interval has elapsed (hours).
+# SCHEDULING=0 checks everything but still records the outcome.
+SCHEDULING = os.getenv("SCHEDULING", "1") != "0"
+SCHEDULE_MIN_HOURS = float(os.getenv("SCHEDULE_MIN_HOURS", "6"))
+SCHEDULE_INITIAL_HOURS = float(os.getenv("SCHEDULE_INITIAL_HOURS", "24"))
+SCHEDULE_MAX_HOURS = float(os.getenv("SCHEDULE_MAX_HOURS", str(14 * 24)))
+# Diff page link snapshots between runs instead of rescanning every anchor
+CHANGE_DETECTION = os.getenv("CHANGE_DETECTION", "1") != "0"
+# Read news/IR pages from their RSS/Atom feed or sitemap when one exists, else scan anchors
+FEED_FIRST = os.getenv("FEED_FIRST", "1") != "0"
+FEED_DISCOVERY_TTL_DAYS = float(os.getenv("FEED_DISCOVERY_TTL_DAYS", "7"))
+FEED_MAX_AGE_DAYS = float(os.getenv("FEED_MAX_AGE_DAYS", "30"))
+FEED_SITEMAP_TITLES = int(os.getenv("FEED_SITEMAP_TITLES", "20"))
+# Article text extraction for summaries: streaming mode and per-document ceilings
+ARTICLE_STREAMING = os.getenv("ARTICLE_STREAMING", "1") != "0"
+ARTICLE_MAX_CHARS = 3000
+ARTICLE_MAX_BYTES = int(os.getenv("ARTICLE_MAX_BYTES", str(2 * 1024 * 1024)))
+ARTICLE_MAX_SECONDS = float(os.getenv("ARTICLE_MAX_SECONDS", "15"))
+ARTICLE_CHUNK_SIZE = 16 * 1024
+SUMMARY_MODEL = "grok-4"
+# Articles per batched summary request (1 disables batching) and its prompt token budget
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_BATCH_TOKENS = int(os.getenv("SUMMARY_BATCH_TOKENS", "12000"))
+SUMMARY_CACHE_TTL_DAYS = int(os.getenv("SUMMARY_CACHE_TTL_DAYS", "90"))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+# Relevance gate before summarization: default score threshold, items scored per batch and
+# new links with non-matching text per news page that are scored on their article text
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "1"))
+RELEVANCE_BATCH_SIZE = int(os.getenv("RELEVANCE_BATCH_SIZE", "32"))
+RELEVANCE_MAX_CANDIDATES = int(os.getenv("RELEVANCE_MAX_CANDIDATES", "10"))
+# Per-run JSON/CSV report directory; PROFILE_MODE=cprofile or tracemalloc adds a profile capture
+REPORT_DIR = os.getenv("REPORT_DIR", "reports")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "").strip().lower()
+
+
+def scored_results(results):
+    """Results that passed the relevance check; candidates still 'pending' were never scored."""
+    return [res for res in results if not res.get('below_threshold') and not res.get('pending')]
+
 
 class CompetitorMonitor:
-    def __init__(self):
+    """Competitor monitoring run over the targets in the Config sheet.
+
+    Backends (spreadsheet, Grok, HTTP, mail) and local stores are created on
+    first use, so helpers and partial modes only pay for what they touch:
+
+    - full: fetch every source, summarize, write the Data sheet and email a digest
+    - web-only: news/IR pages only; no Grok calls (no X source, no article summaries)
+    - dry-run: fetch and print what would be saved; no sheet writes, email or saved state
+    - config-only: read the Config sheet and print the fetch plan
+
+    With SHARD_COUNT > 1, run() only handles this runner's shard of the targets
+    and writes its new, summarized results to a shard file instead of the sheet;
+    merge_shards() then writes every shard's rows and sends one digest.
+    """
+
+    def __init__(self, spreadsheet=None, mode=None, shard=None):
+        """spreadsheet: an already opened gspread-like Spreadsheet; skips service-account auth.
+        shard: (index, count) overriding SHARD_INDEX / SHARD_COUNT."""
+        self.mode = mode or RUN_MODE
+        if self.mode not in RUN_MODES:
+            raise ValueError(f"Unknown run mode {self.mode!r}; expected one of {', '.join(RUN_MODES)}")
+        self.shard_index, self.shard_count = shard or (SHARD_INDEX, SHARD_COUNT)
+        if self.shard_count < 1 or not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"Invalid shard {self.shard_index} of {self.shard_count}")
+
+        # Per-stage / per-target timings and counters, written as a report after each run
+        self.profiler = RunProfiler(PROFILE_MODE or None)
+
         self.grok_api_key = os.getenv("GROK_API_KEY")
         self.spreadsheet_id = os.getenv("SPREADSHEET_ID")
-        
-        if not self.grok_api_key:
-            raise ValueError("GROK_API_KEY not found. Set it in .env or as environment variable.")
-        if not self.spreadsheet_id:
-            raise ValueError("SPREADSHEET_ID not found. Set it in .env or as environment variable.")
-        
-        # Initialize Google Sheets Client (using google-auth)
-        scope = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        # Load service account info: try env var first (GitHub Actions), then file (local)
-        sa_json = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON", "").strip()
-        if sa_json:
-            print(f"Loading service account from environment variable (length: {len(sa_json)} chars)...")
-            try:
-                service_account_info = json.loads(sa_json)
-            except json.JSONDecodeError as e:
-                print(f"ERROR: GOOGLE_SERVICE_ACCOUNT_JSON is not valid JSON: {e}")
-                print(f"First 50 chars: {repr(sa_json[:50])}")
-                raise
-        else:
-            print(f"Loading service account from {SERVICE_ACCOUNT_FILE}...")
-            with open(SERVICE_ACCOUNT_FILE, 'r', encoding='utf-8') as f:
-                service_account_info = json.load(f)
-        
-        # Ensure private key has correct newlines
-        if 'private_key' in service_account_info:
-            key = service_account_info['private_key']
-            key = key.replace('\\n', '\n')
-            service_account_info['private_key'] = key
-                
-        creds = Credentials.from_service_account_info(service_account_info, scopes=scope)
-        self.client_gs = gspread.authorize(creds)
-        self.sheet = self.client_gs.open_by_key(self.spreadsheet_id)
+        if spreadsheet is not None:
+            self.sheet = spreadsheet
+
+        # Per-stage stats of the last save_results pipeline run, and the results it saved
+        self.pipeline_stats = {}
+        self.new_results = []
+        # Fetch tasks of the last fetch_all that failed (left out of the schedule update)
+        self.failed_tasks = []
+        # Page link deltas read from shard files (merge_shards)
+        self.shard_deltas = {}
 
         # Initialize User Agent
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
-        # Initialize OpenAI client for Grok
-        self.client_ai = OpenAI(
+    @property
+    def uses_llm(self):
+        return self.mode in ('full', 'dry-run')
+
+    @property
+    def read_only(self):
+        return self.mode in ('dry-run', 'config-only')
+
+    @property
+    def sharded(self):
+        return self.shard_count > 1
+
+    @cached_property
+    def sheets_io(self):
+        """All Sheets API calls go through sheets_io so they are counted and paced."""
+        from sheets_io import SheetsIO
+        return SheetsIO(quota_per_minute=SHEETS_QUOTA_PER_MINUTE, chunk_rows=SHEETS_CHUNK_ROWS)
+
+    @cached_property
+    def sheet(self):
+        if not self.spreadsheet_id:
+            raise ValueError("SPREADSHEET_ID not found. Set it in .env or as environment variable.")
+        return open_spreadsheet(self.spreadsheet_id, self.sheets_io, SERVICE_ACCOUNT_FILE)
+
+    @cached_property
+    def llm(self):
+        """The shared Grok client (async, rate-limited, with retries)."""
+        if not self.grok_api_key:
+            raise ValueError("GROK_API_KEY not found. Set it in .env or as environment variable.")
+        from llm_client import GrokClient
+        return GrokClient(
             api_key=self.grok_api_key,
-            base_url="https://api.x.ai/v1",
+            base_url=GROK_BASE_URL,
+            max_in_flight=LLM_MAX_IN_FLIGHT,
+            rpm=LLM_RPM,
+            tpm=LLM_TPM,
+            timeout=LLM_TIMEOUT,
+            deadline=LLM_DEADLINE,
+            max_retries=LLM_RETRIES
+        )
+
+    @cached_property
+    def http(self):
+        """One pooled HTTP client (keep-alive, retries, per-host limits) for all fetches."""
+        from http_client import HttpClient
+        return HttpClient(
+            headers=self.headers,
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            retries=HTTP_RETRIES,
+            backoff_factor=HTTP_BACKOFF,
+            per_host_concurrency=MAX_PER_HOST,
+            per_host_rate=HOST_RATE_PER_SEC,
+            per_host_burst=HOST_BURST
+        )
+
+    @cached_property
+    def mailer(self):
+        return SmtpMailer(
+            SMTP_HOST, SMTP_PORT,
+            os.getenv("GMAIL_USER") or "", os.getenv("GMAIL_APP_PASSWORD") or "",
+            starttls=SMTP_STARTTLS
+        )
+
+    def cache_path(self, name):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        return os.path.join(CACHE_DIR, name)
+
+    @cached_property
+    def page_cache(self):
+        """Conditional-GET cache for news, IR and article pages.
+
+        Dry runs keep it in memory, so they do not mark pages as seen for the next real run.
+        """
+        return PageCache(
+            ':memory:' if self.read_only else self.cache_path('pages.db'),
+            max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024,
+            max_age_days=PAGE_CACHE_MAX_AGE_DAYS
+        )
+
+    @cached_property
+    def summary_cache(self):
+        """Memoized article summaries, shared across URLs with identical content."""
+        return SummaryCache(
+            self.cache_path('summaries.db'),
+            ttl_days=SUMMARY_CACHE_TTL_DAYS,
+            max_entries=SUMMARY_CACHE_MAX_ENTRIES
+        )
+
+    @cached_property
+    def dedup_index(self):
+        """Hashed URLs already in the Data sheet (replaces full-sheet reads)."""
+        return DedupIndex(self.cache_path('dedup.db'))
+
+    @cached_property
+    def results_store(self):
+        """Indexed local history of saved rows, queried by results_cli.py."""
+        return ResultsStore(RESULTS_DB or self.cache_path('results.db'), canonicalize=canonicalize_url)
+
+    @cached_property
+    def url_validator(self):
+        """Validation of URLs returned by Grok, over the shared client."""
+        return UrlValidator(
+            self.http, self.headers,
+            self.cache_path('url_verdicts.db'),
+            ttl_hours=URL_VERDICT_TTL_HOURS
+        )
+
+    @cached_property
+    def scheduler(self):
+        """Adaptive per-target/per-source polling state."""
+        return PollScheduler(
+            self.cache_path('schedule.db'),
+            min_interval=SCHEDULE_MIN_HOURS * 3600,
+            initial_interval=SCHEDULE_INITIAL_HOURS * 3600,
+            max_interval=SCHEDULE_MAX_HOURS * 3600
+        )
+
+    @cached_property
+    def snapshots(self):
+        """Last-seen links per monitored page, so only added/changed links are processed."""
+        if not CHANGE_DETECTION or self.read_only:
+            return None
+        return SnapshotStore(self.cache_path('snapshots.db'))
+
+    @cached_property
+    def feeds(self):
+        """Discovered feeds/sitemaps per monitored page and how far they were read."""
+        if not FEED_FIRST:
+            return None
+        return FeedReader(
+            ':memory:' if self.read_only else self.cache_path('feeds.db'), self.fetch_page,
+            discovery_ttl=FEED_DISCOVERY_TTL_DAYS * 86400,
+            max_age=FEED_MAX_AGE_DAYS * 86400,
+            sitemap_titles=FEED_SITEMAP_TITLES
+        )
+
+    @cached_property
+    def relevance(self):
+        """Relevance engine over the default keywords; run() replaces it with the Config's rules."""
+        return self.build_relevance([])
+
+    def build_relevance(self, targets):
+        """Compile the default and per-target keyword rules of the Config rows into one engine."""
+        defaults = {'news': [(k, 1.0) for k in KEYWORDS], 'ir': [(k, 1.0) for k in IR_KEYWORDS]}
+        return RelevanceEngine.from_config(targets, defaults, threshold=RELEVANCE_THRESHOLD)
+
+    @cached_property
+    def link_extractor(self):
+        """Each news/IR page is fetched and parsed once, then matched against each target's rule sets."""
+        from link_extractor import LinkExtractor
+        return LinkExtractor(
+            self.relevance.matcher(), self.fetch_page,
+            snapshots=self.snapshots, canonicalize=canonicalize_url, profiler=self.profiler,
+            feeds=self.feeds
         )
 
+    def created(self, name):
+        """True if the lazily created backend or store `name` was used in this process."""
+        return name in self.__dict__
+
+    def fetch_page(self, url):
+        """Fetch a page through the conditional-GET cache."""
+        return self.page_cache.fetch(url, self.headers, timeout=10, opener=self.counted_get)
+
+    def counted_get(self, url, **kwargs):
+        """http.get that adds the downloaded body size to the current profiler stage."""
+        response = self.http.get(url, **kwargs)
+        self.profiler.add(bytes=len(response.content), pages=1)
+        return response
+
     def fetch_config(self):
         """Read target companies from 'Config' sheet."""
-        try:
-            worksheet = self.sheet.worksheet("Config")
-        except gspread.exceptions.WorksheetNotFound:
+        with self.profiler.stage('fetch_config'):
+            return self._fetch_config()
+
+    def _fetch_config(self):
+        worksheet = self.sheets_io.find_worksheet(self.sheet, "Config")
+        if worksheet is None:
+            if self.read_only:
+                return []
             # Create Config sheet if not exists
-            worksheet = self.sheet.add_worksheet(title="Config", rows=100, cols=5)
-            worksheet.append_row(["Company Name", "News URL", "X Query (Optional)", "IR URL (Optional)"])
+            worksheet = self.sheets_io.call(self.sheet.add_worksheet, title="Config", rows=100,
+                                            cols=len(CONFIG_HEADERS))
+            self.sheets_io.call(worksheet.append_row, CONFIG_HEADERS)
             return []
 
-        records = worksheet.get_all_records()
+        # One read for the whole target list
+        records = self.sheets_io.call(worksheet.get_all_records)
         print(f"Config: Found {len(records)} targets")
-        for i, r in enumerate(records):
-            print(f"  [{i+1}] Keys: {list(r.keys())} | Company: '{r.get('Company Name', 'N/A')}'")
+        if VERBOSE:
+            for i, r in enumerate(records):
+                print(f"  [{i+1}] Keys: {list(r.keys())} | Company: '{r.get('Company Name', 'N/A')}'")
         return records
 
-    def is_relevant(self, text):
-        """Check if text contains any of the target keywords."""
-        if not text:
-            return False
-        for keyword in KEYWORDS:
-            if keyword in text:
-                return True
-        return False
-
     def fetch_x_updates(self, company_name, custom_query=None):
-        """Fetch X updates using Grok API with keyword filtering."""
+        """Fetch X updates using Grok API with keyword filtering; None if the call failed."""
         print(f"Fetching X updates for {company_name} (Query: {custom_query if custom_query else 'default'})...")
         
         if custom_query:
             query_instruction = f"Target: {company_name}. Specific search context: {custom_query}."
         else:
-            keywords_str = " OR ".join(f'"{k}"' for k in KEYWORDS)
+            keywords_str = " OR ".join(f'"{k}"' for k in self.relevance.keywords(company_name, 'news'))
             query_instruction = f"Recent posts or news regarding '{company_name}' on X (formerly Twitter) that match ANY of these keywords: {keywords_str}."
 
         prompt = f"""
@@ -124,219 +397,454 @@ class CompetitorMonitor:
         Output ONLY valid JSON.
         """
 
+        messages = [
+            {"role": "system", "content": "You are a research assistant. Output only JSON."},
+            {"role": "user", "content": prompt},
+        ]
+        fallback_url = f"https://x.com/search?q={company_name}&src=typed_query"
+
         try:
-            response = self.client_ai.chat.completions.create(
-                model="grok-3",
-                messages=[
-                    {"role": "system", "content": "You are a research assistant. Output only JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-            )
-            content = response.choices[0].message.content
-            # Clean up potential markdown blocks
-            content = content.replace("```json", "").replace("```", "").strip()
-            results = json.loads(content)
-            
-            # Validate URLs - Grok often returns fake/hallucinated URLs
-            for item in results:
-                url = item.get('url')
-                if url:
+            results = []
+            checks = []
+            with ThreadPoolExecutor(max_workers=max(1, URL_CHECK_WORKERS)) as pool:
+                def take(item):
+                    # Validate URLs as soon as each item is parsed - Grok often returns fake/hallucinated URLs
+                    results.append(item)
+                    url = item.get('url')
+                    checks.append(pool.submit(self.url_validator.validate, url) if isinstance(url, str) and url else None)
+
+                if X_STREAMING:
+                    parser = JsonArrayStream()
                     try:
-                        r = requests.head(url, headers=self.headers, timeout=5, allow_redirects=True)
-                        if r.status_code >= 400:
-                            # Replace with X search link
-                            item['url'] = f"https://x.com/search?q={company_name}&src=typed_query"
-                    except Exception:
-                        item['url'] = f"https://x.com/search?q={company_name}&src=typed_query"
+                        for delta in self.llm.stream(model="grok-3", messages=messages):
+                            for item in parser.feed(delta):
+                                take(item)
+                    except Exception as e:
+                        if not results:
+                            raise
+                        print(f"  X stream for {company_name} ended early ({e}); keeping {len(results)} parsed items")
+                    for item in parser.fallback():
+                        take(item)
                 else:
-                    item['url'] = f"https://x.com/search?q={company_name}&src=typed_query"
+                    response = self.llm.complete(model="grok-3", messages=messages)
+                    for item in parse_json_array(response.choices[0].message.content):
+                        take(item)
+
+                for item, check in zip(results, checks):
+                    if check is None or not check.result():
+                        # Replace with X search link
+                        item['url'] = fallback_url
             
             return results
         except Exception as e:
             print(f"Error fetching X for {company_name}: key error or other issue: {e}")
-            return []
+            return None
 
     def fetch_website_news(self, url, company_name):
-        """Fetch news from company website looking for keywords."""
+        """Fetch news from company website looking for keywords; None if the page could not be scanned."""
         if not url:
             return []
             
         print(f"Fetching website news for {company_name} ({url})...")
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            updates = []
-            # Find all links that contain keywords
-            links = soup.find_all('a')
-            seen_urls = set()
-            
-            for link in links:
-                text = link.get_text(strip=True)
-                href = link.get('href')
-                
-                if not href:
-                    continue
-                    
-                # Resolve relative URLs
-                full_url = requests.compat.urljoin(url, href)
-                
-                if full_url in seen_urls:
-                    continue
-                
-                if self.is_relevant(text):
-                    seen_urls.add(full_url)
-                    updates.append({
-                        'company': company_name,
-                        'source': 'Website News',
-                        'title': text[:100], # Truncate title
-                        'url': full_url,
-                        'summary': f"Found keyword match in link text: {text}"
-                    })
-            
-            return updates
-            
+            hits = self.link_extractor.scan(url, self.relevance.matcher(company_name))
         except Exception as e:
             print(f"Error scraping {url}: {e}")
+            return None
+
+        if hits is None:
+            print(f"  Unchanged since last run, skipping: {url}")
+            return []
+        results = [{
+            'company': company_name,
+            'source': SOURCE_LABELS['news'],
+            'title': text[:100], # Truncate title
+            'url': full_url,
+            'summary': f"Found keyword match in link text: {text}",
+            'change': change
+        } for text, full_url, change in hits['news']]
+        return results + self.relevance_candidates(url, company_name, hits)
+
+    def relevance_candidates(self, url, company_name, hits):
+        """New same-site links whose text matched no rule (e.g. "お知らせ"), to be judged on their article text."""
+        if RELEVANCE_MAX_CANDIDATES <= 0 or url in self.link_extractor.baselines:
+            # A first scan lists every link on the page as new, navigation included
             return []
+        matched = {full_url for links in hits.values() for _, full_url, _ in links}
+        host = urlsplit(url).netloc.lower().removeprefix('www.')
+        candidates = []
+        for text, full_url, change in self.link_extractor.links(url):
+            if full_url in matched or urlsplit(full_url).netloc.lower().removeprefix('www.') != host:
+                continue
+            matched.add(full_url)
+            candidates.append({
+                'company': company_name,
+                'source': SOURCE_LABELS['news'],
+                'title': (text or full_url)[:100],
+                'url': full_url,
+                'summary': f"New link: {text}",
+                'change': change,
+                'pending': True
+            })
+            if len(candidates) >= RELEVANCE_MAX_CANDIDATES:
+                break
+        return candidates
 
     def fetch_ir_updates(self, url, company_name):
-        """Fetch IR updates with specific keywords."""
+        """Fetch IR updates with specific keywords; None if the page could not be scanned."""
         if not url:
             return []
             
         print(f"Fetching IR updates for {company_name} ({url})...")
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            updates = []
-            links = soup.find_all('a')
-            seen_urls = set()
-            
-            # IR Keywords
-            ir_keywords = ["決算", "Financial", "Report", "Presentation", "説明会", "有価証券報告書", "短信"]
-            
-            for link in links:
-                text = link.get_text(strip=True)
-                href = link.get('href')
-                
-                if not href:
-                    continue
-                    
-                full_url = requests.compat.urljoin(url, href)
-                
-                if full_url in seen_urls:
-                    continue
-                
-                # Check for IR keywords
-                if any(k in text for k in ir_keywords):
-                    seen_urls.add(full_url)
-                    updates.append({
-                        'company': company_name,
-                        'source': 'IR',
-                        'title': text[:100],
-                        'url': full_url,
-                        'summary': f"IR Match: {text}"
-                    })
-            
-            return updates
-            
+            # IR PDFs are rarely in a sitemap, so only a real feed may replace the page scan
+            hits = self.link_extractor.scan(url, self.relevance.matcher(company_name), sitemaps=False)
         except Exception as e:
             print(f"Error scraping IR {url}: {e}")
+            return None
+
+        if hits is None:
+            print(f"  Unchanged since last run, skipping: {url}")
             return []
+        return [{
+            'company': company_name,
+            'source': SOURCE_LABELS['ir'],
+            'title': text[:100],
+            'url': full_url,
+            'summary': f"IR Match: {text}",
+            'change': change
+        } for text, full_url, change in hits['ir']]
+
+    def fetch_article_text(self, url):
+        """Return the first ARTICLE_MAX_CHARS characters of an article's main text."""
+        if not ARTICLE_STREAMING:
+            # Fetch page content (cached bodies are reused on 304)
+            from bs4 import BeautifulSoup
+            page = self.fetch_page(url)
+            soup = BeautifulSoup(page.content, 'html.parser')
 
-    def summarize_article(self, url, title):
-        """Fetch article content and generate a summary using Grok."""
-        if not url or url == 'No URL':
-            return ""
-        
-        try:
-            # Fetch page content
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
             # Extract main text (remove scripts, styles, nav)
             for tag in soup(['script', 'style', 'nav', 'header', 'footer']):
                 tag.decompose()
             text = soup.get_text(separator='\n', strip=True)
-            # Limit to first 3000 chars to avoid token limits
-            text = text[:3000]
-            
-            if not text.strip():
-                return ""
-            
-            # Use Grok to summarize
-            prompt = f"""以下の記事内容を日本語で200文字以内に要約してください。
-記事タイトル: {title}
-記事内容:
-{text}
+            # Limit to avoid token limits
+            return text[:ARTICLE_MAX_CHARS]
 
-要約のみを出力してください。"""
-            
-            ai_response = self.client_ai.chat.completions.create(
-                model="grok-4",
+        # Streaming mode: revalidate against the page cache, then parse chunks as they arrive
+        entry = self.page_cache.get(url)
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.http.get(url, headers=headers, stream=True, timeout=10)
+        try:
+            if response.status_code == 304 and entry:
+                chunks, encoding = [entry['body']], None
+            else:
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=ARTICLE_CHUNK_SIZE)
+                match = re.search(r'charset=["\']?([\w-]+)', response.headers.get('Content-Type', ''))
+                encoding = match.group(1) if match else None
+
+            text, body, complete = extract_text_streaming(
+                chunks, encoding=encoding, max_chars=ARTICLE_MAX_CHARS,
+                max_bytes=ARTICLE_MAX_BYTES, max_seconds=ARTICLE_MAX_SECONDS
+            )
+        finally:
+            response.close()
+
+        if response.status_code != 304:
+            self.profiler.add(bytes=len(body), pages=1)
+            # Only keep validators for full bodies, so a truncated prefix is never served on 304
+            self.page_cache.store(
+                url, body,
+                etag=response.headers.get('ETag') if complete else None,
+                last_modified=response.headers.get('Last-Modified') if complete else None
+            )
+        return text
+
+    def read_article_text(self, url):
+        """fetch_article_text that returns "" instead of raising."""
+        if not url or url == 'No URL':
+            return ""
+        try:
+            return self.fetch_article_text(url)
+        except Exception as e:
+            print(f"  Could not fetch article {url}: {e}")
+            return ""
+
+    def summarize_text(self, title, text, check_cache=True):
+        """Summarize already extracted article text with a single Grok request."""
+        if not text.strip():
+            return ""
+
+        # Reuse a previous summary of the same text (e.g. mirrored press releases)
+        cached = self.summary_cache.get(text, SUMMARY_MODEL) if check_cache else None
+        if cached is not None:
+            print(f"  Summary cache hit: {title[:50]}...")
+            return cached
+
+        try:
+            ai_response = self.llm.complete(
+                model=SUMMARY_MODEL,
                 messages=[
-                    {"role": "system", "content": "あなたは記事要約の専門家です。簡潔に要約してください。"},
-                    {"role": "user", "content": prompt},
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": single_prompt(title, text)},
                 ],
             )
-            summary = ai_response.choices[0].message.content.strip()
+            summary = ai_response.choices[0].message.content.strip()[:500]  # Safety limit
+            usage = getattr(ai_response, 'usage', None)
+            tokens = getattr(usage, 'total_tokens', 0) or 0
+            self.profiler.add(stage='summarize', llm_calls=1, tokens=tokens)
+            self.summary_cache.put(text, SUMMARY_MODEL, summary, tokens=tokens)
             print(f"  Summarized: {title[:50]}...")
-            return summary[:500]  # Safety limit
-            
+            return summary
         except Exception as e:
-            print(f"  Could not summarize {url}: {e}")
+            print(f"  Could not summarize {title[:50]}: {e}")
             return ""
 
-    def save_results(self, results):
-        """Save relevant results to 'Data' sheet, avoiding duplicates."""
+    def summarize_batch(self, batch):
+        """Summarize several (id, title, text) items in one Grok request; returns {id: summary}."""
+        try:
+            ai_response = self.llm.complete(
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": batch_prompt(batch)},
+                ],
+            )
+            summaries = parse_batch_response(ai_response.choices[0].message.content)
+        except Exception as e:
+            print(f"  Batch summary of {len(batch)} articles failed: {e}")
+            return {}
+
+        usage = getattr(ai_response, 'usage', None)
+        tokens = getattr(usage, 'total_tokens', 0) or 0
+        self.profiler.add(stage='summarize', llm_calls=1, tokens=tokens)
+        tokens_each = tokens // len(batch)
+        for item_id, title, text in batch:
+            summary = summaries.get(str(item_id))
+            if summary:
+                self.summary_cache.put(text, SUMMARY_MODEL, summary, tokens=tokens_each)
+        print(f"  Batch-summarized {len(summaries)}/{len(batch)} articles")
+        return summaries
+
+    def summarize_many(self, items, check_cache=True):
+        """Summarize a list of (title, text) pairs, packing uncached ones into batches.
+
+        Items a batch response does not cover fall back to a single request.
+        """
+        summaries = [""] * len(items)
+        pending = []
+        for i, (title, text) in enumerate(items):
+            if not text.strip():
+                continue
+            cached = self.summary_cache.get(text, SUMMARY_MODEL) if check_cache else None
+            if cached is not None:
+                print(f"  Summary cache hit: {title[:50]}...")
+                summaries[i] = cached
+            else:
+                pending.append((i, title, text))
+
+        for batch in pack_batches(pending, SUMMARY_BATCH_TOKENS, max(1, SUMMARY_BATCH_SIZE)):
+            batched = self.summarize_batch(batch) if len(batch) > 1 else {}
+            for i, title, text in batch:
+                summaries[i] = batched.get(str(i)) or self.summarize_text(title, text, check_cache=False)
+        return summaries
+
+    def sheet_revision(self):
+        """Return the spreadsheet's last modified time, or None if unavailable."""
         try:
-            worksheet = self.sheet.worksheet("Data")
-        except gspread.exceptions.WorksheetNotFound:
-            worksheet = self.sheet.add_worksheet(title="Data", rows=1000, cols=7)
-            worksheet.append_row(["Date", "Company", "Source", "Title", "URL", "Summary", "Article Summary"])
+            getter = getattr(self.sheet, 'get_lastUpdateTime', None)
+            return self.sheets_io.call(getter) if getter else self.sheets_io.call(lambda: self.sheet.lastUpdateTime)
+        except Exception as e:
+            print(f"Could not read spreadsheet revision: {e}")
+            return None
 
-        # Fetch existing URLs to avoid duplicates
-        existing_records = worksheet.get_all_records()
-        existing_urls = set(str(r.get('URL', '')).strip() for r in existing_records)
+    def sync_dedup_index(self, worksheet):
+        """Re-seed the local dedup index from the URL column if the sheet changed."""
+        revision = self.sheet_revision()
+        if not self.dedup_index.needs_sync(self.spreadsheet_id, revision, worksheet.row_count):
+            print(f"Dedup index up to date ({self.dedup_index.count()} URLs)")
+            return
+
+        header = self.sheets_io.call(worksheet.row_values, 1)
+        column = header.index('URL') + 1 if 'URL' in header else DATA_HEADERS.index('URL') + 1
+        urls = [canonicalize_url(u) for u in self.sheets_io.call(worksheet.col_values, column)[1:]]
+        self.dedup_index.rebuild(urls)
+        self.dedup_index.set_state(self.spreadsheet_id, revision, worksheet.row_count)
+        print(f"Dedup index re-synced from sheet ({self.dedup_index.count()} URLs)")
 
-        rows_to_add = []
+    def build_row(self, res):
+        """Format a result as a Data sheet row (see DATA_HEADERS)."""
+        return [
+            datetime.now().strftime("%Y-%m-%d"),
+            res['company'],
+            res['source'],
+            res['title'],
+            str(res.get('url', '')).strip(),
+            res['summary'],
+            res.get('article_summary', '')
+        ]
+
+    def data_worksheet(self):
+        """Return the 'Data' worksheet, creating it with headers if needed."""
+        worksheet = self.sheets_io.find_worksheet(self.sheet, "Data")
+        if worksheet is None:
+            worksheet = self.sheets_io.call(self.sheet.add_worksheet, title="Data", rows=1000, cols=7)
+            self.sheets_io.call(worksheet.append_row, DATA_HEADERS)
+        return worksheet
+
+    def rows_written(self, rows):
+        """Checkpoint callback: record rows that reached the sheet locally."""
+        self.dedup_index.add(canonicalize_url(row[4]) for row in rows)
+        self.results_store.add_rows(rows)
+
+    def build_save_pipeline(self, writer):
+        """Stages that turn new results into summarized Data sheet rows (writer=None: summarize only)."""
+        def fetch(job):
+            if not self.uses_llm and not job['res'].get('pending'):
+                # Nothing will be summarized or scored on its body, so the article is not needed
+                job['text'] = ""
+                return job
+            with self.profiler.stage('article_fetch', target=job['res']['company']):
+                job['text'] = self.read_article_text(str(job['res'].get('url', '')).strip())
+            return job
+
+        def score(jobs):
+            # X items were already selected by Grok for the keywords; news/IR items are scored
+            # on title + article text, and only those above the threshold go on to be summarized
+            rules = {SOURCE_LABELS['news']: 'news', SOURCE_LABELS['ir']: 'ir'}
+            todo = [job for job in jobs if job['res'].get('source') in rules]
+            with self.profiler.stage('relevance'):
+                verdicts = self.relevance.score_batch([
+                    (f"{job['res']['title']}\n{job['text']}", job['res']['company'], rules[job['res']['source']])
+                    for job in todo
+                ])
+                self.profiler.add(scored=len(todo), below_threshold=sum(1 for v in verdicts if not v[2]))
+            for job, (value, phrases, relevant) in zip(todo, verdicts):
+                res = job['res']
+                res['relevance'] = round(value, 2)
+                if not relevant:
+                    res['below_threshold'] = True
+                    print(f"  Below relevance threshold ({value:g}): {res['title'][:50]}")
+                elif res.pop('pending', False):
+                    res['summary'] = f"Relevance {value:g}: {', '.join(phrases)}"
+            return [None if job['res'].get('below_threshold') else job for job in jobs]
+
+        def extract(job):
+            # Empty pages need no summary; repeated content is answered from the cache
+            job['text'] = job['text'].strip()
+            if not self.uses_llm:
+                # The text was only fetched for relevance scoring
+                job['summary'] = ""
+                return job
+            job['summary'] = self.summary_cache.get(job['text'], SUMMARY_MODEL) if job['text'] else ""
+            if job['summary']:
+                print(f"  Summary cache hit: {job['res']['title'][:50]}...")
+            return job
+
+        def summarize(jobs):
+            todo = [job for job in jobs if job['summary'] is None]
+            with self.profiler.stage('summarize'):
+                summaries = self.summarize_many([(job['res']['title'], job['text']) for job in todo],
+                                                check_cache=False)
+            for job, summary in zip(todo, summaries):
+                job['summary'] = summary
+            return jobs
+
+        def persist(job):
+            res = job['res']
+            res['article_summary'] = job['summary']
+            if writer is None:
+                # Sharded run: the result goes to the shard file, not the sheet
+                print(f"Prepared: {res['title']}")
+                return job
+            writer.add(self.build_row(res))
+            print(f"Saved: {res['title']}")
+            return job
+
+        return Pipeline([
+            Stage('fetch', self.profiler.wrap(fetch), workers=PIPELINE_FETCH_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+            Stage('score', self.profiler.wrap(score), queue_size=PIPELINE_QUEUE_SIZE,
+                  batch_size=max(1, RELEVANCE_BATCH_SIZE), linger=0.1),
+            Stage('extract', self.profiler.wrap(extract), workers=2, queue_size=PIPELINE_QUEUE_SIZE),
+            Stage('summarize', self.profiler.wrap(summarize), workers=LLM_MAX_IN_FLIGHT, queue_size=PIPELINE_QUEUE_SIZE,
+                  batch_size=max(1, SUMMARY_BATCH_SIZE), linger=0.5),
+            # A failed sheet write must fail the run, not silently drop rows
+            Stage('persist', self.profiler.wrap(persist), queue_size=PIPELINE_QUEUE_SIZE, ordered=True,
+                  critical=True),
+        ])
+
+    def save_results(self, results):
+        """Save relevant results to 'Data' sheet, avoiding duplicates; returns the newly saved ones."""
+        with self.profiler.stage('save_results'):
+            return self._save_results(results)
+
+    def select_new(self, results, worksheet):
+        """Results whose URL is neither in the Data sheet nor earlier in results."""
+        # Check existing URLs against the local index instead of reading the whole sheet
+        if worksheet is not None:
+            self.sync_dedup_index(worksheet)
+        existing_urls = set()
+
+        new_results = []
         for res in results:
             url = str(res.get('url', '')).strip()
+            key = res.get('canonical_url') or canonicalize_url(url)
             
-            # If URL exists, skip (Simple deduplication)
-            if url and url in existing_urls:
+            # If URL exists, skip (compared in canonical form)
+            if key and (key in existing_urls or self.dedup_index.contains(key)):
                 print(f"Skipping duplicate: {res['title']}")
                 continue
-                
-            # Generate article summary using Grok
-            article_summary = self.summarize_article(url, res['title'])
-            
-            rows_to_add.append([
-                datetime.now().strftime("%Y-%m-%d"),
-                res['company'],
-                res['source'],
-                res['title'],
-                url,
-                res['summary'],
-                article_summary
-            ])
-            print(f"Saved: {res['title']}")
             # Add to local set to avoid duplicates within the same run
-            existing_urls.add(url)
-        
-        if rows_to_add:
-            worksheet.append_rows(rows_to_add)
+            existing_urls.add(key)
+            new_results.append(res)
+        self.new_results = new_results
+        return new_results
+
+    def record_sheet_write(self):
+        """Record our own write so the next run does not treat it as an outside edit."""
+        self.dedup_index.set_state(
+            self.spreadsheet_id, self.sheet_revision(),
+            self.sheets_io.call(self.sheet.worksheet, "Data").row_count
+        )
+
+    def _save_results(self, results):
+        worksheet = self.data_worksheet()
+        new_results = self.select_new(results, worksheet)
+
+        # Rows are written in checkpoints, so a crash late in the run keeps earlier work
+        from sheets_io import CheckpointWriter
+        writer = CheckpointWriter(
+            self.sheets_io, worksheet, flush_every=SHEETS_CHECKPOINT_ROWS,
+            on_flush=self.rows_written
+        )
+
+        # Fetch -> extract -> summarize -> persist, each stage with its own queue and workers
+        pipeline = self.build_save_pipeline(writer)
+        pipeline.run({'res': res} for res in new_results)
+        writer.flush()
+        self.pipeline_stats = pipeline.stats()
+        if new_results:
+            print(pipeline.report())
+        self.new_results = scored_results(new_results)
+
+        if writer.written:
+            self.record_sheet_write()
         
-        # Return results with article summaries for email
-        return [r for r in results if str(r.get('url', '')).strip() not in (existing_urls - {str(r.get('url', '')).strip() for r in results})]
+        # Only rows new to the sheet go into the digest (as in save_merged); rows already
+        # saved by an earlier run are not mailed again
+        return self.new_results
 
     def send_email(self, results):
         """Send email notification efficiently."""
+        with self.profiler.stage('send_email'):
+            self._send_email(results)
+
+    def _send_email(self, results):
         gmail_user = os.getenv("GMAIL_USER") or ""
         gmail_password = os.getenv("GMAIL_APP_PASSWORD") or ""
         to_email = os.getenv("TO_EMAIL") or gmail_user
@@ -352,67 +860,337 @@ class CompetitorMonitor:
 
         body = "以下の更新がありました。\n\n"
         for i, res in enumerate(results, 1):
-            body += f"{i}. [{res['company']}] {res['title']} ({res['source']})\n"
+            marker = " [更新]" if res.get('change') == 'changed' else ""
+            body += f"{i}. [{res['company']}] {res['title']} ({res['source']}){marker}\n"
             body += f"   {res.get('url', 'No URL')}\n"
             if res.get('article_summary'):
                 body += f"   📝 {res['article_summary']}\n"
             body += "\n"
         
+        deltas = self.changed_pages()
+        if deltas:
+            body += "ページの変化 (追加 / 変更 / 削除):\n"
+            for page, d in sorted(deltas.items()):
+                body += f"   {page}: +{d['added']} / ~{d['changed']} / -{d['removed']}\n"
+            body += "\n"
+
         body += f"スプレッドシートを確認: https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}"
         msg.attach(MIMEText(body, 'plain'))
 
         try:
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(gmail_user, gmail_password)
-            text = msg.as_string()
-            server.sendmail(gmail_user, to_email, text)
-            server.quit()
+            self.mailer.send(msg, to_email)
             print(f"Email sent to {to_email}")
         except Exception as e:
             print(f"Failed to send email: {e}")
 
-    def run(self):
-        targets = self.fetch_config()
-        if not targets:
-            print("No targets found in Config sheet. Please add some.")
+    def changed_pages(self):
+        """Per-page link deltas (added/changed/removed) of this run and of merged shards."""
+        deltas = dict(self.shard_deltas)
+        if self.created('link_extractor'):
+            deltas.update(self.link_extractor.deltas)
+        return {page: d for page, d in deltas.items() if any(d.values())}
+
+    def shard_targets(self, targets):
+        """(Config position, row) for the rows whose Company Name hashes to this runner's shard."""
+        mine = [(i, t) for i, t in enumerate(targets) if t.get('Company Name')
+                and shard_of(t['Company Name'], self.shard_count) == self.shard_index]
+        print(f"Shard {self.shard_index + 1}/{self.shard_count}: {len(mine)} of {len(targets)} targets")
+        return mine
+
+    def save_shard(self, positions, results):
+        """Summarize this shard's new results and write them to its shard file (no sheet writes)."""
+        with self.profiler.stage('save_shard'):
+            # Duplicates of rows already in the sheet are dropped before any article is summarized
+            new_results = self.select_new(results, self.sheets_io.find_worksheet(self.sheet, "Data"))
+            pipeline = self.build_save_pipeline(None)
+            pipeline.run({'res': res} for res in new_results)
+            self.pipeline_stats = pipeline.stats()
+            if new_results:
+                print(pipeline.report())
+            new_results = self.new_results = scored_results(new_results)
+            path = write_shard(SHARD_DIR, self.shard_index, self.shard_count, {
+                # Config row of each company, so the merge can restore sheet order
+                'targets': {t['Company Name']: i for i, t in positions},
+                'results': new_results,
+                'deltas': self.changed_pages(),
+            })
+            self.stash_seen(new_results)
+        print(f"Shard results written to {path} ({len(new_results)} new items)")
+
+    def commit_seen(self):
+        """Mark this run's scanned links and feed entries as seen; only once their results are saved."""
+        for name in ('snapshots', 'feeds'):
+            store = self.__dict__.get(name)
+            if store is not None:
+                store.commit()
+
+    def stash_seen(self, results):
+        """Sharded run: keep the seen state until the merge step has written results (see restore_seen)."""
+        snapshots = self.__dict__.get('snapshots')
+        feeds = self.__dict__.get('feeds')
+        state = {
+            'urls': [res.get('canonical_url') or canonicalize_url(res.get('url')) for res in results],
+            'snapshots': snapshots.pending if snapshots is not None else {},
+            'feeds': feeds.pending if feeds is not None else {},
+        }
+        with open(self.cache_path('pending_seen.json'), 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+
+    def restore_seen(self):
+        """Sharded run: commit the previous run's seen state if the merge wrote all of its results.
+
+        Otherwise it is discarded, so those pages and feeds are offered again
+        (rows that did reach the sheet are then skipped as duplicates).
+        """
+        path = self.cache_path('pending_seen.json')
+        if not os.path.exists(path):
             return
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        worksheet = self.sheets_io.find_worksheet(self.sheet, "Data")
+        if worksheet is not None:
+            self.sync_dedup_index(worksheet)
+        missing = [url for url in state['urls'] if url and not self.dedup_index.contains(url)]
+        if missing:
+            print(f"Previous shard run: {len(missing)} results never reached the sheet; scanning their pages again")
+        else:
+            if self.snapshots is not None:
+                self.snapshots.pending.update({page: tuple(v) for page, v in state['snapshots'].items()})
+            if self.feeds is not None:
+                self.feeds.pending.update({page: tuple(v) for page, v in state['feeds'].items()})
+            self.commit_seen()
+        os.remove(path)
 
-        all_results = []
+    def merge_shards(self, directory=None):
+        """Merge shard files: dedup across shards, one batched sheet write and one digest."""
+        directory = directory or SHARD_DIR
+        with self.profiler.stage('merge_shards'):
+            payloads = load_shards(directory)
+            order = {}
+            results = []
+            for payload in payloads:
+                order.update(payload.get('targets', {}))
+                results += payload.get('results', [])
+                self.shard_deltas.update(payload.get('deltas', {}))
+            # Stable sort: companies in Config order, each company's items in fetch order.
+            # Shards hold disjoint companies and were near-duplicate merged already;
+            # items repeated across shards are dropped by URL in select_new.
+            results.sort(key=lambda res: order.get(res.get('company'), len(order)))
+        print(f"Merging {len(results)} items from {len(payloads)} shard file(s) in {directory}")
+
+        if self.read_only:
+            for res in results:
+                print(f"  Would save: [{res['company']}] {res['title']} ({res['source']}) {res.get('url', '')}")
+            print(f"Dry run: {len(results)} items merged, nothing written")
+        elif results:
+            saved = self.save_merged(results)
+            if saved:
+                self.send_email(saved)
+            else:
+                print("No new updates across shards.")
+        else:
+            print("No relevant updates found.")
+
+        for name in ('sheets_io',):
+            if self.created(name):
+                print(getattr(self, name).report())
+        self.write_report('merge')
+
+    def save_merged(self, results):
+        """Append the merged shard results that are new to the sheet in one batched write."""
+        with self.profiler.stage('save_results'):
+            worksheet = self.data_worksheet()
+            new_results = self.select_new(results, worksheet)
+            rows = [self.build_row(res) for res in new_results]
+            if rows:
+                self.sheets_io.append_rows(worksheet, rows)
+                self.rows_written(rows)
+                self.record_sheet_write()
+                print(f"Saved {len(rows)} rows")
+        return new_results
+
+    def build_fetch_tasks(self, targets):
+        """Expand Config rows into (kind, company, argument) fetch tasks, in sheet order."""
+        tasks = []
         for target in targets:
             company = target.get('Company Name')
             if not company: continue
 
             # 1. Check X (Grok)
-            x_query = target.get('X Query (Optional)') or target.get('X Query')
-            x_updates = self.fetch_x_updates(company, custom_query=x_query)
-            if x_updates:
-                for update in x_updates:
-                    all_results.append({
-                        'company': company,
-                        'source': 'X (Grok)',
-                        'title': update.get('title', 'Update'),
-                        'url': update.get('url'),
-                        'summary': update.get('summary')
-                    })
-            
+            if self.mode != 'web-only':
+                x_query = target.get('X Query (Optional)') or target.get('X Query')
+                tasks.append(('x', company, x_query))
+
             # 2. Check Website News
             news_url = target.get('News URL')
             if news_url:
-                web_updates = self.fetch_website_news(news_url, company)
-                all_results.extend(web_updates)
+                tasks.append(('news', company, news_url))
 
             # 3. Check IR
             ir_url = target.get('IR URL (Optional)')
             if ir_url:
-                ir_updates = self.fetch_ir_updates(ir_url, company)
-                all_results.extend(ir_updates)
+                tasks.append(('ir', company, ir_url))
+        return tasks
+
+    def run_fetch_task(self, task):
+        """Run a single fetch task and return its results in save_results format; None if it failed."""
+        kind, company, _ = task
+        with self.profiler.stage(kind, target=company):
+            results = self._run_fetch_task(task)
+            if results is None:
+                self.profiler.add(failures=1)
+            else:
+                self.profiler.add(results=len(results))
+        return results
+
+    def _run_fetch_task(self, task):
+        kind, company, arg = task
+        if kind == 'x':
+            x_updates = self.fetch_x_updates(company, custom_query=arg)
+            if x_updates is None:
+                return None
+            return [{
+                'company': company,
+                'source': SOURCE_LABELS['x'],
+                'title': update.get('title', 'Update'),
+                'url': update.get('url'),
+                'summary': update.get('summary')
+            } for update in x_updates]
+        if kind == 'news':
+            return self.fetch_website_news(arg, company)
+        if kind == 'ir':
+            return self.fetch_ir_updates(arg, company)
+        return []
+
+    def due_tasks(self, tasks):
+        """Keep only the tasks whose adaptive polling interval has elapsed."""
+        if not SCHEDULING:
+            return tasks
+        due = [t for t in tasks if self.scheduler.is_due(t[1], t[0])]
+        print(f"Scheduler: {len(due)} of {len(tasks)} target sources due")
+        return due
 
-        if all_results:
+    def record_schedule(self, tasks):
+        """Feed this run's outcome back into the scheduler (changed = something new was saved).
+
+        Failed tasks are not recorded, so they stay due and are retried next run
+        instead of backing off as if the source had been quiet.
+        """
+        fresh = set()
+        for res in self.new_results:
+            for source in res.get('merged_sources') or [res.get('source')]:
+                fresh.add((res.get('company'), source))
+        for task in tasks:
+            if task in self.failed_tasks:
+                continue
+            kind, company, _ = task
+            self.scheduler.record(company, kind, (company, SOURCE_LABELS[kind]) in fresh)
+
+    def fetch_all(self, tasks):
+        """Fetch every task concurrently, returning results in sheet order (failed tasks in failed_tasks)."""
+        all_results = []
+        self.failed_tasks = []
+        with ThreadPoolExecutor(max_workers=max(1, MAX_WORKERS)) as executor:
+            # Futures are consumed in submission order, so output is deterministic
+            run_task = self.profiler.wrap(self.run_fetch_task)
+            futures = [executor.submit(run_task, task) for task in tasks]
+            for task, future in zip(tasks, futures):
+                results = future.result()
+                if results is None:
+                    self.failed_tasks.append(task)
+                else:
+                    all_results.extend(results)
+        return all_results
+
+    def run(self):
+        if self.uses_llm and not self.grok_api_key:
+            # Fail before any work rather than on every X fetch
+            raise ValueError("GROK_API_KEY not found. Set it in .env or as environment variable.")
+        targets = self.fetch_config()
+        if not targets:
+            print("No targets found in Config sheet. Please add some.")
+            self.write_report()
+            return
+        # Per-target keyword rules compiled once for link matching and article scoring
+        self.relevance = self.build_relevance(targets)
+
+        positions = self.shard_targets(targets) if self.sharded else list(enumerate(targets))
+        targets = [t for _, t in positions]
+
+        tasks = self.due_tasks(self.build_fetch_tasks(targets))
+        if self.mode == 'config-only':
+            for kind, company, arg in tasks:
+                print(f"  {company}: {SOURCE_LABELS[kind]} {arg or ''}")
+            print(f"Config-only run: {len(tasks)} fetch tasks planned, nothing fetched")
+            self.write_report()
+            return
+
+        if self.sharded and not self.read_only:
+            self.restore_seen()
+        all_results = self.fetch_all(tasks)
+        # Fold URL variants and near-identical items together before any summarization
+        merged_results = merge_near_duplicates(all_results)
+        if len(merged_results) < len(all_results):
+            print(f"Merged {len(all_results) - len(merged_results)} duplicate items across sources")
+        all_results = merged_results
+
+        if self.mode == 'dry-run':
+            for res in all_results:
+                pending = " [if its article passes the relevance check]" if res.get('pending') else ""
+                print(f"  Would save: [{res['company']}] {res['title']} ({res['source']}) {res.get('url', '')}{pending}")
+            print(f"Dry run: {len(all_results)} items found, nothing written")
+        elif self.sharded:
+            self.save_shard(positions, all_results)
+        elif all_results:
             saved_results = self.save_results(all_results)
-            self.send_email(saved_results if saved_results else all_results)
+            self.commit_seen()
+            if saved_results:
+                self.send_email(saved_results)
+            else:
+                print("No new updates above the relevance threshold.")
         else:
             print("No relevant updates found.")
+            self.commit_seen()
+        if not self.read_only:
+            self.record_schedule(tasks)
+
+        for name in ('page_cache', 'feeds', 'relevance', 'summary_cache', 'url_validator', 'http', 'llm', 'sheets_io'):
+            if self.__dict__.get(name) is not None:
+                print(getattr(self, name).report())
+        if self.created('page_cache'):
+            self.page_cache.evict()
+        if self.created('summary_cache'):
+            self.summary_cache.evict()
+        self.write_report()
+
+    def write_report(self, label=None):
+        """Write this run's instrumentation report (see instrumentation.RunProfiler).
+
+        The file name carries the run mode and shard (or label, e.g. 'merge').
+        """
+        if label is None:
+            label = self.mode + (f"-shard{self.shard_index + 1}of{self.shard_count}" if self.sharded else '')
+        components = {'pipeline': self.pipeline_stats}
+        for name, key in (('page_cache', 'page_cache'), ('feeds', 'feeds'), ('relevance', 'relevance'),
+                          ('summary_cache', 'summary_cache'), ('url_validator', 'url_validator'),
+                          ('http', 'http'), ('sheets_io', 'sheets')):
+            if self.__dict__.get(name) is not None:
+                components[key] = getattr(self, name).stats()
+        if self.created('llm'):
+            components['llm'] = self.llm.stats_dict()
+        try:
+            path = self.profiler.write_report(REPORT_DIR, components=components, label=label)
+            print(f"Run report written to {path}")
+        except Exception as e:
+            print(f"Could not write run report: {e}")
+
+    def close(self):
+        """Release whichever clients and local stores this instance created."""
+        for name in ('http', 'llm', 'page_cache', 'summary_cache', 'dedup_index', 'results_store',
+                     'url_validator', 'scheduler', 'snapshots', 'feeds'):
+            resource = self.__dict__.get(name)
+            if resource is not None:
+                resource.close()
 
 if __name__ == "__main__":
     monitor = CompetitorMonitor()
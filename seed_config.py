@@ -4,13 +4,13 @@ def seed():
     try:
         monitor = CompetitorMonitor()
         try:
-            worksheet = monitor.sheet.worksheet("Config")
+            worksheet = monitor.sheets_io.call(monitor.sheet.worksheet, "Config")
         except:
              print("Config sheet not found (should be impossible as scraper creates it).")
              return
 
         # Check if empty (excluding header)
-        vals = worksheet.get_all_values()
+        vals = monitor.sheets_io.call(worksheet.get_all_values)
         if len(vals) <= 1:
             targets = [
                 ["患者目線のクリニック", "https://k-mesen.jp/", "", ""],
@@ -20,11 +20,12 @@ def seed():
                 ["おうち病院", "https://anamne.com/clinic/hayfever/", "", ""],
                 ["からだ内科クリニック", "https://karada-naika.com/blog/telem-hay-fever/", "", ""],
             ]
-            for t in targets:
-                worksheet.append_row(t)
-            print("Seeded 6 targets successfully.")
+            # One batched append instead of a request per target
+            monitor.sheets_io.append_rows(worksheet, targets)
+            print(f"Seeded {len(targets)} targets successfully.")
         else:
             print(f"Config sheet already has {len(vals)-1} entries. Skipping seed.")
+        print(monitor.sheets_io.report())
             
     except Exception as e:
         print(f"Error seeding: {e}")
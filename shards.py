@@ -0,0 +1,52 @@
+"""Sharded runs: split the Config targets across runners and merge their partial results.
+
+Each runner processes the companies whose stable hash falls in its shard and
+writes a shard file; merge_shards.py folds the files back together.
+"""
+import glob
+import hashlib
+import json
+import os
+
+
+SHARD_FILE = 'shard-{index}-of-{count}.json'
+
+
+def shard_of(company, count):
+    """Shard index of a company name; the same on every runner and Python version."""
+    digest = hashlib.sha1(str(company).strip().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def write_shard(directory, index, count, payload):
+    """Write one shard's payload atomically; returns the file path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, SHARD_FILE.format(index=index, count=count))
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(dict(payload, shard=index, shards=count), f, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+    return path
+
+
+def load_shards(directory):
+    """Shard payloads found under directory (searched recursively), ordered by shard index.
+
+    A shard written twice (e.g. a re-run job) is read once. Missing shards are
+    reported but do not stop the merge.
+    """
+    payloads = {}
+    for path in sorted(glob.glob(os.path.join(directory, '**', 'shard-*-of-*.json'), recursive=True)):
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        payloads.setdefault((payload['shards'], payload['shard']), payload)
+
+    counts = {count for count, _ in payloads}
+    if len(counts) > 1:
+        raise ValueError(f"Shard files in {directory} come from runs with different shard counts: {sorted(counts)}")
+    if counts:
+        count = counts.pop()
+        missing = sorted(set(range(count)) - {index for _, index in payloads})
+        if missing:
+            print(f"Warning: no results for shard(s) {', '.join(map(str, missing))} of {count}")
+    return [payloads[key] for key in sorted(payloads)]
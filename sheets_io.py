@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+from collections import deque
+
+import gspread
+
+
+# Sheets API statuses that are worth retrying: quota exhaustion and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503}
+# Appends are not idempotent: a 5xx may come back after the rows were written, so only
+# quota rejections (nothing written) are retried
+APPEND_RETRY_STATUSES = {429}
+
+
+class SheetsIO:
+    """Google Sheets call wrapper: counts API calls, paces them under the per-minute
+    quota and retries quota/transient errors with jittered exponential backoff."""
+
+    def __init__(self, quota_per_minute=55, max_retries=5, backoff=2.0, chunk_rows=500):
+        self.quota_per_minute = quota_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.chunk_rows = chunk_rows
+        self.calls = 0
+        self.retries = 0
+        self.peak_per_minute = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def _pace(self):
+        """Block until another call fits in the rolling one-minute quota window."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 60:
+                    self._recent.popleft()
+                if len(self._recent) < self.quota_per_minute:
+                    self._recent.append(now)
+                    self.calls += 1
+                    self.peak_per_minute = max(self.peak_per_minute, len(self._recent))
+                    return
+                wait = 60 - (now - self._recent[0])
+            print(f"  Sheets quota window full, waiting {wait:.1f}s...")
+            time.sleep(wait)
+
+    def call(self, fn, *args, **kwargs):
+        """Run one Sheets API call (any gspread method) under pacing and retries."""
+        return self._call(fn, args, kwargs, RETRY_STATUSES)
+
+    def _call(self, fn, args, kwargs, retry_statuses):
+        for attempt in range(self.max_retries + 1):
+            self._pace()
+            try:
+                return fn(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                response = getattr(e, 'response', None)
+                status = getattr(response, 'status_code', None)
+                if status not in retry_statuses or attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                print(f"  Sheets API {status}, retrying in {delay:.1f}s...")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+    def find_worksheet(self, spreadsheet, title):
+        """Return the worksheet called title, or None if the spreadsheet has none."""
+        try:
+            return self.call(spreadsheet.worksheet, title)
+        except gspread.exceptions.WorksheetNotFound:
+            return None
+
+    def append_rows(self, worksheet, rows):
+        """Append rows in chunks of chunk_rows to stay under request payload limits."""
+        rows = list(rows)
+        for start in range(0, len(rows), self.chunk_rows):
+            self._call(worksheet.append_rows, (rows[start:start + self.chunk_rows],), {}, APPEND_RETRY_STATUSES)
+        return len(rows)
+
+    def stats(self):
+        return {'calls': self.calls, 'retries': self.retries, 'peak_per_minute': self.peak_per_minute}
+
+    def report(self):
+        return (f"Sheets API: {self.calls} calls, {self.retries} retries, "
+                f"peak {self.peak_per_minute}/min (quota {self.quota_per_minute}/min)")
+
+
+class CheckpointWriter:
+    """Buffer rows for one worksheet and append them every flush_every rows."""
+
+    def __init__(self, sheets_io, worksheet, flush_every=50, on_flush=None):
+        self.sheets_io = sheets_io
+        self.worksheet = worksheet
+        self.flush_every = max(1, flush_every)
+        self.on_flush = on_flush
+        self.pending = []
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        with self._lock:
+            self.pending.append(row)
+            if len(self.pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        # Rows leave pending only once their append succeeded, so a failed flush loses nothing
+        while self.pending:
+            rows = self.pending[:self.sheets_io.chunk_rows]
+            self.sheets_io.append_rows(self.worksheet, rows)
+            del self.pending[:len(rows)]
+            self.written += len(rows)
+            print(f"  Checkpoint: wrote {len(rows)} rows ({self.written} this run)")
+            if self.on_flush:
+                self.on_flush(rows)
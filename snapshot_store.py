@@ -0,0 +1,109 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def short_hash(value):
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+
+
+def content_digest(content):
+    """Hex digest of a page body, to tell whether its committed snapshot is current."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.blake2b(content or b'', digest_size=8).hexdigest()
+
+
+class SnapshotStore:
+    """Last-seen (canonical URL, link text) set per monitored page, stored as 8-byte hashes.
+
+    diff() keeps the new snapshot of a page pending; commit() stores it once the
+    results found on the page are safely saved, so a failed run offers them again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS links (
+                page BLOB,
+                link BLOB,
+                text BLOB,
+                PRIMARY KEY (page, link)
+            ) WITHOUT ROWID
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                page BLOB PRIMARY KEY,
+                url TEXT,
+                checked_at REAL
+            )
+        """)
+        # Body digest each committed snapshot was taken from
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS page_digests (
+                page BLOB PRIMARY KEY,
+                digest TEXT
+            ) WITHOUT ROWID
+        """)
+        self._db.commit()
+
+    def known(self, page_url):
+        """True if page_url has a snapshot from an earlier run."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM pages WHERE page = ?", (short_hash(page_url),)
+            ).fetchone() is not None
+
+    def is_current(self, page_url, content):
+        """True if the committed snapshot of page_url was taken from exactly this content."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM page_digests WHERE page = ?", (short_hash(page_url),)
+            ).fetchone()
+        return row is not None and row[0] == content_digest(content)
+
+    def diff(self, page_url, links, content=None):
+        """Compare links ({canonical URL: link text}) with the stored snapshot.
+
+        The new snapshot (and the digest of the content it came from) is kept
+        pending until commit(). Returns (added URLs, changed URLs, number of
+        removed links).
+        """
+        page = short_hash(page_url)
+        current = {short_hash(url): (url, short_hash(text)) for url, text in links.items()}
+        with self._lock:
+            previous = dict(self._db.execute(
+                "SELECT link, text FROM links WHERE page = ?", (page,)
+            ).fetchall())
+            self.pending[page_url] = (dict(links), content_digest(content) if content is not None else None)
+
+        added = [url for key, (url, _) in current.items() if key not in previous]
+        changed = [url for key, (url, text) in current.items() if key in previous and previous[key] != text]
+        removed = sum(1 for key in previous if key not in current)
+        return added, changed, removed
+
+    def commit(self):
+        """Store every pending snapshot, replacing the page's previous one."""
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            for page_url, (links, digest) in pending.items():
+                page = short_hash(page_url)
+                self._db.execute("DELETE FROM links WHERE page = ?", (page,))
+                self._db.executemany(
+                    "INSERT INTO links VALUES (?, ?, ?)",
+                    ((page, short_hash(url), short_hash(text)) for url, text in links.items())
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (page, page_url, time.time())
+                )
+                self._db.execute("INSERT OR REPLACE INTO page_digests VALUES (?, ?)", (page, digest))
+            self._db.commit()
+        return len(pending)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,83 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+class SummaryCache:
+    """Persistent article-summary memo keyed by a hash of the article text and model."""
+
+    def __init__(self, path, ttl_days=90, max_entries=5000):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                summary TEXT,
+                tokens INTEGER,
+                created_at REAL,
+                last_used REAL
+            )
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def make_key(text, model):
+        return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+    def get(self, text, model):
+        """Return the memoized summary for text/model, or None on a miss."""
+        key = self.make_key(text, model)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, tokens, created_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[2] <= self.ttl:
+                self._db.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self.hits += 1
+                self.tokens_saved += row[1] or 0
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, text, model, summary, tokens=0):
+        key = self.make_key(text, model)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, summary, tokens, now, now)
+            )
+            self._db.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        with self._lock:
+            self._db.execute("DELETE FROM summaries WHERE created_at < ?", (time.time() - self.ttl,))
+            self._db.execute("""
+                DELETE FROM summaries WHERE key IN (
+                    SELECT key FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._db.commit()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'tokens_saved': self.tokens_saved}
+
+    def report(self):
+        return (f"Summary cache: {self.hits} hits / {self.misses} misses "
+                f"(~{self.tokens_saved} tokens saved)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from feeds import FeedReader
+from link_extractor import LinkExtractor
+from relevance import RelevanceEngine
+
+
+def fake_fetch(pages):
+    """fetch() over a {url: body} dict; unknown URLs fail like a 404."""
+    def fetch(url):
+        if url not in pages:
+            raise IOError(f"404 {url}")
+        body = pages[url]
+        return SimpleNamespace(content=body.encode('utf-8') if isinstance(body, str) else body, unchanged=False)
+    return fetch
+
+
+def rss(*items):
+    return '<rss><channel>' + ''.join(
+        f'<item><title>{title}</title><link>{link}</link><pubDate>{date}</pubDate></item>'
+        for title, link, date in items
+    ) + '</channel></rss>'
+
+
+def test_ir_page_is_scanned_when_sitemap_lists_nothing_in_its_section():
+    pages = {
+        'https://e.com/ir/': '<html><head></head><body><a href="/pdf/tanshin.pdf">決算短信</a></body></html>',
+        'https://e.com/sitemap.xml': '<urlset><url><loc>https://e.com/news/1</loc></url></urlset>',
+    }
+    fetch = fake_fetch(pages)
+    engine = RelevanceEngine({'news': [('花粉症', 1.0)], 'ir': [('決算', 1.0)]})
+    for sitemaps in (True, False):
+        extractor = LinkExtractor(engine.matcher(), fetch, feeds=FeedReader(':memory:', fetch))
+        hits = extractor.scan('https://e.com/ir/', sitemaps=sitemaps)
+        assert [url for _, url, _ in hits['ir']] == ['https://e.com/pdf/tanshin.pdf']
+
+
+def test_ir_page_never_reads_a_sitemap():
+    pages = {
+        'https://e.com/ir/': '<html><head></head><body></body></html>',
+        'https://e.com/sitemap.xml': '<urlset><url><loc>https://e.com/ir/library</loc></url></urlset>',
+    }
+    assert FeedReader(':memory:', fake_fetch(pages)).entries('https://e.com/ir/', sitemaps=False) is None
+    # The same sitemap does serve a news page in that section
+    entries = FeedReader(':memory:', fake_fetch(pages)).entries('https://e.com/ir/')
+    assert [url for _, url, _ in entries] == ['https://e.com/ir/library']
+
+
+def test_site_wide_advertised_feed_does_not_replace_a_section_page():
+    head = '<html><head><link rel="alternate" type="application/rss+xml" href="/feed/"></head><body></body></html>'
+    pages = {
+        'https://e.com/': head,
+        'https://e.com/ir/': head,
+        'https://e.com/feed/': rss(('Blog post', 'https://e.com/2026/10/post', 'Sat, 03 Oct 2026 00:00:00 GMT')),
+    }
+    reader = FeedReader(':memory:', fake_fetch(pages), max_age=10 ** 10)
+    assert reader.entries('https://e.com/ir/') is None
+    assert [url for _, url, _ in reader.entries('https://e.com/')] == ['https://e.com/2026/10/post']
+
+
+def test_entry_dated_at_the_read_position_is_not_lost():
+    pages = {
+        'https://e.com/news/': '<html><head><link rel="alternate" type="application/rss+xml" '
+                               'href="/news/feed"></head><body></body></html>',
+        'https://e.com/news/feed': rss(('A', 'https://e.com/news/a', 'Sat, 03 Oct 2026 00:00:00 GMT')),
+    }
+    reader = FeedReader(':memory:', fake_fetch(pages), max_age=10 ** 10)
+    assert [url for _, url, _ in reader.entries('https://e.com/news/')] == ['https://e.com/news/a']
+    reader.commit()
+
+    # B carries the same day-only date as A, the committed read position
+    pages['https://e.com/news/feed'] = rss(('B', 'https://e.com/news/b', 'Sat, 03 Oct 2026 00:00:00 GMT'),
+                                           ('A', 'https://e.com/news/a', 'Sat, 03 Oct 2026 00:00:00 GMT'))
+    assert [url for _, url, _ in reader.entries('https://e.com/news/')] == ['https://e.com/news/b']
+    reader.commit()
+    assert reader.entries('https://e.com/news/') == []
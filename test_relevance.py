@@ -0,0 +1,17 @@
+from relevance import RelevanceEngine, KEYWORD_COLUMNS, THRESHOLD_COLUMN
+
+
+DEFAULTS = {'news': [('花粉症', 1.0)], 'ir': [('決算', 1.0), ('有価証券報告書', 1.0)]}
+
+
+def test_company_threshold_only_applies_to_its_own_rules():
+    targets = [{'Company Name': 'A', KEYWORD_COLUMNS['news']: '花粉症:1, オンライン診療:1', THRESHOLD_COLUMN: '2'}]
+    engine = RelevanceEngine.from_config(targets, DEFAULTS)
+    (_, _, news_single), (_, _, news_both), (ir_score, _, ir_relevant) = engine.score_batch([
+        ('花粉症', 'A', 'news'),
+        ('花粉症のオンライン診療', 'A', 'news'),
+        ('決算短信', 'A', 'ir'),
+    ])
+    assert (news_single, news_both) == (False, True)
+    # The default IR phrases keep the default threshold
+    assert (ir_score, ir_relevant) == (1.0, True)
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+from url_validator import UrlValidator
+
+
+class FakeSession:
+    """HEAD answers from a list of statuses (or exceptions), one per request."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.requests = 0
+
+    def head(self, url, **kwargs):
+        self.requests += 1
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(status_code=answer, close=lambda: None)
+
+
+def test_transient_failures_are_not_cached():
+    session = FakeSession([ConnectionError("reset"), 503, 429, 200])
+    validator = UrlValidator(session, {}, ':memory:')
+    assert [validator.validate('https://e.com/a') for _ in range(3)] == [False, False, False]
+    assert validator.validate('https://e.com/a') is True
+    assert session.requests == 4
+
+
+def test_success_and_gone_verdicts_are_cached():
+    session = FakeSession([200, 404])
+    validator = UrlValidator(session, {}, ':memory:')
+    assert validator.validate('https://e.com/a') is True
+    assert validator.validate('https://e.com/gone') is False
+    assert validator.validate('https://e.com/a') is True
+    assert validator.validate('https://e.com/gone') is False
+    assert session.requests == 2
@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+import time
+
+
+# Status codes from servers that refuse HEAD but may answer GET
+HEAD_REJECTED = {400, 403, 405, 501}
+# Statuses that mean the page is gone; other errors (429, 5xx, ...) may pass and are not cached
+DEAD_STATUSES = {404, 410}
+
+
+class UrlValidator:
+    """Thread-safe URL liveness checks with a persistent, TTL-bound verdict cache.
+
+    Per-host limits are left to the session (http_client.HttpClient).
+    """
+
+    def __init__(self, session, headers, cache_path, ttl_hours=72, timeout=5):
+        self.session = session
+        self.headers = headers
+        self.ttl = ttl_hours * 3600
+        self.timeout = timeout
+        self.checked = 0
+        self.cached = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                url TEXT PRIMARY KEY,
+                ok INTEGER,
+                checked_at REAL
+            )
+        """)
+        self._db.commit()
+
+    def _cached_verdict(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT ok, checked_at FROM verdicts WHERE url = ?", (url,)
+            ).fetchone()
+        if row and time.time() - row[1] <= self.ttl:
+            return bool(row[0])
+        return None
+
+    def _store_verdict(self, url, ok):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?)", (url, int(ok), time.time())
+            )
+            self._db.commit()
+
+    def check(self, url):
+        """Probe url with HEAD, falling back to a one-byte ranged GET if HEAD is refused.
+
+        Returns the final HTTP status, or None if the request failed.
+        """
+        try:
+            r = self.session.head(url, headers=self.headers, timeout=self.timeout, allow_redirects=True)
+            if r.status_code in HEAD_REJECTED:
+                ranged = dict(self.headers, Range='bytes=0-0')
+                r = self.session.get(url, headers=ranged, timeout=self.timeout,
+                                     allow_redirects=True, stream=True)
+                r.close()
+            return r.status_code
+        except Exception:
+            return None
+
+    def validate(self, url):
+        """Return True if url is reachable, using the verdict cache when fresh.
+
+        Only a success (< 400) or a 404/410 is cached; a timeout, connection error,
+        429 or 5xx counts as unreachable for this call only.
+        """
+        verdict = self._cached_verdict(url)
+        if verdict is not None:
+            with self._lock:
+                self.cached += 1
+            return verdict
+        status = self.check(url)
+        ok = status is not None and status < 400
+        if ok or status in DEAD_STATUSES:
+            self._store_verdict(url, ok)
+        with self._lock:
+            self.checked += 1
+        return ok
+
+    def stats(self):
+        return {'probed': self.checked, 'from_cache': self.cached}
+
+    def report(self):
+        return f"URL validation: {self.checked} probed / {self.cached} from cache"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,4 +1,4 @@
-from scraper import CompetitorMonitor
+from scraper import CompetitorMonitor, DATA_HEADERS
 import sys
 
 # Set stdout to utf-8 just in case
@@ -6,21 +6,25 @@ sys.stdout.reconfigure(encoding='utf-8')
 
 def verify():
     monitor = CompetitorMonitor()
-    worksheet = monitor.sheet.worksheet("Data")
-    rows = worksheet.get_all_values()
+    worksheet = monitor.sheets_io.call(monitor.sheet.worksheet, "Data")
+    # Read only the rows printed below and the Source column, not the whole sheet
+    rows = monitor.sheets_io.call(worksheet.get_values, 'A1:G4')
+    source_column = monitor.sheets_io.call(worksheet.col_values, DATA_HEADERS.index('Source') + 1)
     
-    print(f"Total rows in Data sheet: {len(rows)}")
-    if len(rows) > 1:
+    print(f"Total rows in Data sheet: {len(source_column)}")
+    if len(source_column) > 1:
         print("Header:", rows[0])
         print("First 3 data rows:")
         for i, row in enumerate(rows[1:4]):
             print(f"Row {i+1}: {row}")
             
         # Check source types
-        sources = set(r[2] for r in rows[1:])
+        sources = set(source_column[1:])
         print(f"Sources found: {sources}")
     else:
         print("Data sheet is empty (only header or less).")
+    print(f"Local results store: {monitor.results_store.count()} rows (query with results_cli.py)")
+    monitor.close()
 
 if __name__ == "__main__":
     verify()